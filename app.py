@@ -12,6 +12,16 @@ from models import db
 from email_service import mail
 from routes import main
 from database import init_database
+from email_outbox import init_outbox
+from status_events import init_status_events
+from venue_cache import init_venue_cache
+from ics_feeds import init_calendar_feeds
+from reference_numbers import init_reference_numbers
+from bulk_import import register_cli
+from archive import register_archive_cli
+from metrics import init_metrics
+from db_routing import configure_engines
+from template_cache import init_template_cache
 
 
 # <<< FIX: Define the custom filter function >>>
@@ -28,12 +38,40 @@ def create_app(config_class=Config):
     app.jinja_env.filters["escapejs"] = escapejs_filter
 
     # Initialize extensions
+    configure_engines(app)
     db.init_app(app)
     mail.init_app(app)
 
     # Register blueprints
     app.register_blueprint(main)
 
+    # Template bytecode cache and optional pre-compilation
+    init_template_cache(app)
+
+    # flask import-bookings
+    register_cli(app)
+
+    # flask archive-bookings
+    register_archive_cli(app)
+
+    # Booking reference number allocator
+    init_reference_numbers(app)
+
+    # Venue catalog shared by forms, views and emails
+    init_venue_cache(app)
+
+    # Pre-rendered iCalendar feeds served to subscribed clients
+    init_calendar_feeds(app)
+
+    # Booking status pub/sub for the long-poll
+    init_status_events(app)
+
+    # Optional per-request timing and /admin/metrics
+    init_metrics(app)
+
+    # Background email senders, started by each process's first request
+    init_outbox(app)
+
     return app
 
 
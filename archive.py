@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Archival of past bookings.
+
+Conflict checks, reviews and the admin pages only care about pending and
+upcoming bookings, so processed bookings whose event is more than
+ARCHIVE_AFTER_DAYS in the past are moved to the booking_archive table.
+Each batch is copied with one INSERT ... SELECT and deleted in the same
+transaction, so an interrupted run leaves every booking in exactly one of
+the two tables and can simply be started again.
+
+Status pages, the status API and the CSV export fall back to the archive,
+and the dashboard counters include it. Run it from cron, e.g. nightly:
+
+    flask archive-bookings
+"""
+
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+
+from models import db, BookingRequest, ArchivedBooking, VenueAvailability
+from email_outbox import sends_queued_mail
+
+# Columns copied unchanged from booking_request
+ARCHIVE_COLUMNS = (
+    "id",
+    "booking_id",
+    "reference_number",
+    "user_name",
+    "user_email",
+    "venue_id",
+    "event_date",
+    "start_time",
+    "end_time",
+    "event_title",
+    "event_description",
+    "status",
+    "created_at",
+    "processed_at",
+    "admin_response",
+    "series_id",
+)
+
+
+def archive_cutoff(days=None):
+    """Events before this date are old enough to archive"""
+    days = days or current_app.config["ARCHIVE_AFTER_DAYS"]
+    return date.today() - timedelta(days=days)
+
+
+def _archivable(cutoff):
+    return db.session.query(BookingRequest.id).filter(
+        BookingRequest.event_date < cutoff,
+        BookingRequest.status != "pending",
+        BookingRequest.is_processed.is_(True),
+    )
+
+
+def count_archivable(cutoff):
+    return _archivable(cutoff).count()
+
+
+def archive_bookings(cutoff, batch_size=None):
+    """Move processed bookings for events before cutoff; returns the count"""
+    batch_size = batch_size or current_app.config["ARCHIVE_BATCH_SIZE"]
+    columns = [getattr(BookingRequest, name) for name in ARCHIVE_COLUMNS]
+    total = 0
+    while True:
+        ids = [
+            booking_id
+            for (booking_id,) in _archivable(cutoff)
+            .order_by(BookingRequest.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+        now = datetime.utcnow()
+        db.session.execute(
+            db.insert(ArchivedBooking).from_select(
+                [*ARCHIVE_COLUMNS, "archived_at"],
+                db.select(*columns, db.literal(now, db.DateTime)).where(
+                    BookingRequest.id.in_(ids)
+                ),
+            )
+        )
+        db.session.execute(
+            db.delete(BookingRequest).where(BookingRequest.id.in_(ids)),
+            execution_options={"synchronize_session": False},
+        )
+        db.session.commit()
+        total += len(ids)
+
+    # Slot bitmaps of past days are never consulted again
+    db.session.execute(
+        db.delete(VenueAvailability).where(VenueAvailability.event_date < cutoff)
+    )
+    db.session.commit()
+    return total
+
+
+def find_booking(reference):
+    """The live booking with this reference, else the archived one, else None"""
+    booking = BookingRequest.query.filter_by(reference_number=reference).first()
+    if booking is None:
+        booking = ArchivedBooking.query.filter_by(reference_number=reference).first()
+    return booking
+
+
+def register_archive_cli(app):
+    @app.cli.command("archive-bookings")
+    @click.option(
+        "--days",
+        type=click.IntRange(min=1),
+        help="Archive events older than this many days (ARCHIVE_AFTER_DAYS)",
+    )
+    @click.option("--batch-size", type=click.IntRange(min=1))
+    @click.option("--dry-run", is_flag=True, help="Only count the bookings")
+    @sends_queued_mail
+    def archive_bookings_command(days, batch_size, dry_run):
+        """Move processed bookings of past events to the archive table."""
+        cutoff = archive_cutoff(days)
+        if dry_run:
+            click.echo(
+                f"{count_archivable(cutoff)} bookings before {cutoff} would be archived"
+            )
+            return
+        total = archive_bookings(cutoff, batch_size)
+        click.echo(f"Archived {total} bookings with events before {cutoff}")
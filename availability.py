@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Slot-bitmap availability index for approved bookings.
+
+Each (venue, date) pair gets one integer whose bits mark the approved
+30-minute slots of the booking grid (09:00 - 21:00, the same grid that
+BookingForm offers). Checking a request for conflicts is then a single
+mask AND, however many bookings the venue already has that day.
+"""
+
+from datetime import timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, BookingRequest, VenueAvailability, time_to_minutes
+
+# Must match the time choices in BookingForm
+SLOT_START_MINUTES = 9 * 60
+SLOT_LENGTH_MINUTES = 30
+SLOT_COUNT = 24
+SLOT_START_TIME = "09:00"
+
+
+def _slot_index(minutes):
+    return (minutes - SLOT_START_MINUTES) // SLOT_LENGTH_MINUTES
+
+
+def _slot_time(index):
+    minutes = SLOT_START_MINUTES + index * SLOT_LENGTH_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def minutes_mask(start_minutes, end_minutes):
+    """Return the bitmask covering the half-open range [start, end) in minutes"""
+    first = max(_slot_index(start_minutes), 0)
+    last = min(_slot_index(end_minutes), SLOT_COUNT)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def slot_mask(start_time, end_time):
+    """Return the bitmask covering the half-open range [start_time, end_time)"""
+    return minutes_mask(time_to_minutes(start_time), time_to_minutes(end_time))
+
+
+def has_conflict(venue_id, event_date, start_time, end_time, exclude_id=None):
+    """Ask the database whether an approved booking overlaps the given slot.
+
+    Runs a single EXISTS query on the integer minute columns, so the
+    answer comes from an index range scan without loading any rows. Used
+    as a guard beside the bitmaps, which are derived data.
+    """
+    start_minutes = time_to_minutes(start_time)
+    end_minutes = time_to_minutes(end_time)
+    query = BookingRequest.query.filter(
+        BookingRequest.venue_id == venue_id,
+        BookingRequest.event_date == event_date,
+        BookingRequest.status == "approved",
+        # Overlap condition: (StartA < EndB) and (StartB < EndA)
+        BookingRequest.start_minutes < end_minutes,
+        start_minutes < BookingRequest.end_minutes,
+    )
+    if exclude_id is not None:
+        query = query.filter(BookingRequest.id != exclude_id)
+    return db.session.query(query.exists()).scalar()
+
+
+def get_booked_mask(venue_id, event_date):
+    """Return the approved-slot bitmap for a venue on a given date"""
+    entry = db.session.get(VenueAvailability, (venue_id, event_date))
+    return entry.slot_mask if entry else 0
+
+
+def get_booked_masks(venue_id, date_from, date_to):
+    """Return {date: bitmap} for the booked days of a venue in a date range"""
+    rows = db.session.query(
+        VenueAvailability.event_date, VenueAvailability.slot_mask
+    ).filter(
+        VenueAvailability.venue_id == venue_id,
+        VenueAvailability.event_date >= date_from,
+        VenueAvailability.event_date <= date_to,
+        VenueAvailability.slot_mask != 0,
+    )
+    return dict(rows)
+
+
+def free_hours(venue_ids, date_from, days=1):
+    """Return ({venue_id: free hours}, bitmap rows) over ``days`` days.
+
+    The bitmaps come from one (venue_id, event_date, slot_mask) query and
+    are unpacked into a venues x days x slots occupancy matrix, so the free
+    time of every venue is a single vectorised sum.
+    """
+    # Imported here: only the venues page needs numpy, and loading it at
+    # module import adds noticeably to every worker's startup
+    import numpy as np
+
+    venue_ids = list(venue_ids)
+    rows = (
+        db.session.query(
+            VenueAvailability.venue_id,
+            VenueAvailability.event_date,
+            VenueAvailability.slot_mask,
+        )
+        .filter(
+            VenueAvailability.event_date >= date_from,
+            VenueAvailability.event_date < date_from + timedelta(days=days),
+            VenueAvailability.slot_mask != 0,
+        )
+        .order_by(VenueAvailability.venue_id, VenueAvailability.event_date)
+        .all()
+    )
+
+    masks = np.zeros((len(venue_ids), days), dtype=np.int64)
+    row_of = {venue_id: i for i, venue_id in enumerate(venue_ids)}
+    for venue_id, event_date, mask in rows:
+        if venue_id in row_of:
+            masks[row_of[venue_id], (event_date - date_from).days] = mask
+
+    # occupied[v, d, s] is 1 when slot s of day d is booked at venue v
+    occupied = (masks[:, :, np.newaxis] >> np.arange(SLOT_COUNT)) & 1
+    free_slots = days * SLOT_COUNT - occupied.sum(axis=(1, 2))
+    hours = free_slots * SLOT_LENGTH_MINUTES / 60
+    return dict(zip(venue_ids, hours.tolist())), rows
+
+
+def booked_slots(mask):
+    """Expand a bitmap into merged {"start", "end"} ranges for the frontend"""
+    slots = []
+    index = 0
+    while index < SLOT_COUNT:
+        if mask >> index & 1:
+            start = index
+            while index < SLOT_COUNT and mask >> index & 1:
+                index += 1
+            slots.append({"start": _slot_time(start), "end": _slot_time(index)})
+        else:
+            index += 1
+    return slots
+
+
+def reserve_slots(booking):
+    """Atomically claim the booking's slots in the index.
+
+    A single conditional UPDATE sets the bits only if none of them is taken
+    yet, so two overlapping approvals racing each other can't both succeed.
+    Only the venue's row for that day is locked, never the whole table.
+    Returns False on a conflict; the caller commits or rolls back.
+    """
+    mask = minutes_mask(booking.start_minutes, booking.end_minutes)
+    key = (
+        VenueAvailability.venue_id == booking.venue_id,
+        VenueAvailability.event_date == booking.event_date,
+    )
+    for _ in range(2):
+        result = db.session.execute(
+            db.update(VenueAvailability)
+            .where(*key, VenueAvailability.slot_mask.op("&")(mask) == 0)
+            .values(slot_mask=VenueAvailability.slot_mask.op("|")(mask)),
+            execution_options={"synchronize_session": False},
+        )
+        if result.rowcount == 1:
+            return True
+        if db.session.query(VenueAvailability.slot_mask).filter(*key).first():
+            return False  # The row exists, so some slot is already taken
+
+        # First approval for this venue and day: create its row. A concurrent
+        # insert of the same row makes the savepoint fail; retry the UPDATE.
+        try:
+            with db.session.begin_nested():
+                db.session.add(
+                    VenueAvailability(
+                        venue_id=booking.venue_id,
+                        event_date=booking.event_date,
+                        slot_mask=mask,
+                    )
+                )
+            return True
+        except IntegrityError:
+            continue
+    return False
+
+
+def conflicting_dates(venue_id, dates, mask):
+    """Return the dates on which any slot of ``mask`` is already approved.
+
+    All dates are checked with one query over the venue's bitmaps, so a
+    recurring series costs the same as a single booking.
+    """
+    rows = db.session.query(VenueAvailability.event_date).filter(
+        VenueAvailability.venue_id == venue_id,
+        VenueAvailability.event_date.in_(list(dates)),
+        VenueAvailability.slot_mask.op("&")(mask) != 0,
+    )
+    return sorted(event_date for (event_date,) in rows)
+
+
+def reserve_dates(venue_id, dates, mask):
+    """Claim the same slots on several dates at once, all or nothing.
+
+    One conditional UPDATE sets the bits on the days that already have a
+    bitmap row and one INSERT adds the rest. Returns the conflicting dates
+    (empty on success); on a conflict the caller rolls back.
+    """
+    dates = set(dates)
+    existing = {
+        event_date
+        for (event_date,) in db.session.query(VenueAvailability.event_date).filter(
+            VenueAvailability.venue_id == venue_id,
+            VenueAvailability.event_date.in_(list(dates)),
+        )
+    }
+    if existing:
+        result = db.session.execute(
+            db.update(VenueAvailability)
+            .where(
+                VenueAvailability.venue_id == venue_id,
+                VenueAvailability.event_date.in_(list(existing)),
+                VenueAvailability.slot_mask.op("&")(mask) == 0,
+            )
+            .values(slot_mask=VenueAvailability.slot_mask.op("|")(mask)),
+            execution_options={"synchronize_session": False},
+        )
+        if result.rowcount != len(existing):
+            return conflicting_dates(venue_id, existing, mask)
+
+    missing = dates - existing
+    if missing:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(
+                    db.insert(VenueAvailability),
+                    [
+                        {"venue_id": venue_id, "event_date": d, "slot_mask": mask}
+                        for d in missing
+                    ],
+                )
+        except IntegrityError:
+            # A concurrent approval created some of these days first
+            return conflicting_dates(venue_id, missing, mask) or sorted(missing)
+    return []
+
+
+def reserve_masks(masks):
+    """Claim different slots on many (venue, date) days, all or nothing.
+
+    ``masks`` maps (venue_id, event_date) to the bits to set. Existing rows
+    get one conditional UPDATE per day, missing ones a single INSERT.
+    Returns False if any slot was taken meanwhile; the caller then rolls
+    back.
+    """
+    keys = list(masks)
+    existing = {
+        (venue_id, event_date)
+        for venue_id, event_date in db.session.query(
+            VenueAvailability.venue_id, VenueAvailability.event_date
+        ).filter(
+            db.tuple_(VenueAvailability.venue_id, VenueAvailability.event_date).in_(
+                keys
+            )
+        )
+    }
+    for venue_id, event_date in existing:
+        mask = masks[(venue_id, event_date)]
+        result = db.session.execute(
+            db.update(VenueAvailability)
+            .where(
+                VenueAvailability.venue_id == venue_id,
+                VenueAvailability.event_date == event_date,
+                VenueAvailability.slot_mask.op("&")(mask) == 0,
+            )
+            .values(slot_mask=VenueAvailability.slot_mask.op("|")(mask)),
+            execution_options={"synchronize_session": False},
+        )
+        if result.rowcount != 1:
+            return False
+
+    missing = [key for key in keys if key not in existing]
+    if missing:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(
+                    db.insert(VenueAvailability),
+                    [
+                        {"venue_id": v, "event_date": d, "slot_mask": masks[(v, d)]}
+                        for v, d in missing
+                    ],
+                )
+        except IntegrityError:
+            return False  # A concurrent approval created one of these days
+    return True
+
+
+def rebuild_availability_index():
+    """Recompute every bitmap from the approved bookings in the table"""
+    masks = {}
+    rows = db.session.query(
+        BookingRequest.venue_id,
+        BookingRequest.event_date,
+        BookingRequest.start_minutes,
+        BookingRequest.end_minutes,
+    ).filter(BookingRequest.status == "approved")
+    for venue_id, event_date, start_minutes, end_minutes in rows:
+        key = (venue_id, event_date)
+        masks[key] = masks.get(key, 0) | minutes_mask(start_minutes, end_minutes)
+
+    VenueAvailability.query.delete()
+    for (venue_id, event_date), mask in masks.items():
+        db.session.add(
+            VenueAvailability(venue_id=venue_id, event_date=event_date, slot_mask=mask)
+        )
+    db.session.commit()
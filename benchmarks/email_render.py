@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Per-email render cost: compiling the template on every send vs. the cache.
+
+Usage: python benchmarks/email_render.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import Config
+
+
+class BenchConfig(Config):
+    SECRET_KEY = "benchmark"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    MAIL_OUTBOX_WORKERS = 0
+
+
+TEMPLATES = [
+    "email/admin_notification.html",
+    "email/booking_approved.html",
+    "email/booking_rejected.html",
+]
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = create_app(BenchConfig)
+    booking = SimpleNamespace(
+        reference_number="VB123456",
+        user_name="Jane Doe",
+        user_email="jane@example.com",
+        event_title="Faculty Briefing",
+        event_description="Quarterly briefing",
+        event_date=date(2030, 1, 15),
+        start_time="10:00",
+        end_time="12:00",
+        admin_response="See you there",
+    )
+    context = dict(
+        booking=booking,
+        venue=SimpleNamespace(name="TUM Main Hall"),
+        review_url="http://x/r",
+        calendar_url="http://x/c",
+    )
+
+    with app.app_context():
+        env = app.jinja_env
+        for name in TEMPLATES:
+            source = env.loader.get_source(env, name)[0]
+
+            # Before: the template source is parsed and compiled for every email
+            before = timeit.timeit(
+                lambda: env.from_string(source).render(**context), number=iterations
+            )
+            # After: compiled once, then only rendered
+            after = timeit.timeit(
+                lambda: env.get_template(name).render(**context), number=iterations
+            )
+            print(
+                f"{name:32} compile+render {before / iterations * 1e6:8.1f} us"
+                f"   cached {after / iterations * 1e6:8.1f} us"
+                f"   ({before / after:.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
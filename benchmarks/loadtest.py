@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Load test for the booking routes with machine-readable results.
+
+Boots create_app against a throwaway SQLite file (or --database-url, e.g.
+a local Postgres), with a local SMTP sink for the outbox senders and a
+fake Calendar API. It seeds venues and bookings, then drives a weighted
+mix of requests from several client threads and prints throughput and
+p50/p95/p99 latency per route as JSON.
+
+Usage:
+    python benchmarks/loadtest.py [--bookings 5000] [--requests 2000]
+        [--concurrency 8] [--mix book=15,venues=25,status=35,dashboard=15,export=10]
+        [--database-url postgresql://localhost/bench] [--output results.json]
+
+The mix may also weight ``calendar`` (batched event inserts against the
+fake Calendar API), which is off by default. Everything in the database
+at --database-url is dropped first.
+"""
+
+import argparse
+import json
+import os
+import random
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import Config
+from database import init_database
+from email_outbox import OutboxSenderPool
+from models import db, Venue, BookingRequest
+from availability import SLOT_COUNT, SLOT_LENGTH_MINUTES, SLOT_START_MINUTES
+from availability import rebuild_availability_index
+from booking_stats import recompute_booking_stats
+from ics_feeds import rebuild_calendar_feeds
+
+DEFAULT_MIX = "book=15,venues=25,status=35,dashboard=15,export=10,calendar=0"
+DEFAULT_MIX_NAMES = [item.split("=")[0] for item in DEFAULT_MIX.split(",")]
+SEED_DAYS = 60
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Accepts and discards mail, counting the messages"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self._reply("220 localhost sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self.wfile.write(b"250-localhost\r\n250 8BITMIME\r\n")
+            elif command == "DATA":
+                self._reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self._reply("250 queued")
+            elif command == "QUIT":
+                self._reply("221 bye")
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                self._reply("250 ok")
+
+
+class FakeCalendarAPI(ThreadingHTTPServer):
+    """Answers Calendar v3 event inserts and batch requests"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _CalendarHandler)
+        self.events = 0
+
+    @property
+    def root_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+class _CalendarHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type="application/json"):
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        if self.path.startswith("/batch/"):
+            boundary = self.headers.get_param("boundary")
+            parts = [
+                part for part in body.split(f"--{boundary}") if "Content-ID:" in part
+            ]
+            out = []
+            for part in parts:
+                content_id = part.split("Content-ID: <", 1)[1].split(">", 1)[0]
+                out.append(
+                    "--sink\r\nContent-Type: application/http\r\n"
+                    f"Content-ID: <response-{content_id}>\r\n\r\n"
+                    "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n"
+                    f'{{"id": "{uuid.uuid4().hex}"}}\r\n'
+                )
+            self.server.events += len(parts)
+            self._send("".join(out) + "--sink--\r\n", "multipart/mixed; boundary=sink")
+        else:
+            self.server.events += 1
+            self._send(f'{{"id": "{uuid.uuid4().hex}"}}')
+
+
+def _config(database_url, smtp_port, calendar_url):
+    class LoadTestConfig(Config):
+        SECRET_KEY = "loadtest"
+        SQLALCHEMY_DATABASE_URI = database_url
+        WTF_CSRF_ENABLED = False
+        MAIL_SERVER = "127.0.0.1"
+        MAIL_PORT = smtp_port
+        MAIL_USE_TLS = False
+        MAIL_USERNAME = "bookings@example.com"
+        MAIL_PASSWORD = None
+        ADMIN_EMAIL = "admin@example.com"
+        MAIL_OUTBOX_WORKERS = 0  # Started once the tables are seeded
+        MAIL_OUTBOX_POLL_INTERVAL = 0.2
+        GOOGLE_CALENDAR_ROOT_URL = calendar_url
+        SERVER_NAME = "localhost"
+
+    return LoadTestConfig
+
+
+def _time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def seed(app, bookings, extra_venues, rng):
+    """Create the tables and insert venues and a mix of bookings"""
+    with app.app_context():
+        db.drop_all()
+        init_database(app)
+        for i in range(extra_venues):
+            db.session.add(
+                Venue(
+                    name=f"Load Test Room {i + 1}",
+                    description="Seeded by the load test",
+                    capacity=30,
+                    location="Benchmark Block",
+                    amenities="Projector",
+                )
+            )
+        db.session.commit()
+        venue_ids = [venue_id for (venue_id,) in db.session.query(Venue.id)]
+
+        today = date.today()
+        taken = {}
+        rows = []
+        now = datetime.utcnow()
+        for i in range(bookings):
+            venue_id = rng.choice(venue_ids)
+            event_date = today + timedelta(days=rng.randrange(SEED_DAYS))
+            first = rng.randrange(SLOT_COUNT - 1)
+            length = rng.randint(1, min(4, SLOT_COUNT - first))
+            start = SLOT_START_MINUTES + first * SLOT_LENGTH_MINUTES
+            end = start + length * SLOT_LENGTH_MINUTES
+            mask = ((1 << length) - 1) << first
+
+            # About half become approved where the slots are still free
+            key = (venue_id, event_date)
+            status = "pending"
+            if rng.random() < 0.5 and not taken.get(key, 0) & mask:
+                taken[key] = taken.get(key, 0) | mask
+                status = "approved"
+            elif rng.random() < 0.2:
+                status = "rejected"
+
+            rows.append(
+                {
+                    "booking_id": str(uuid.uuid4()),
+                    "reference_number": f"LT{i:07d}",
+                    "user_name": f"User {i % 500}",
+                    "user_email": f"user{i % 500}@example.com",
+                    "venue_id": venue_id,
+                    "event_date": event_date,
+                    "start_time": _time(start),
+                    "end_time": _time(end),
+                    "start_minutes": start,
+                    "end_minutes": end,
+                    "event_title": f"Event {i}",
+                    "event_description": "Seeded by the load test",
+                    "status": status,
+                    "is_processed": status != "pending",
+                    "processed_at": now if status != "pending" else None,
+                    "created_at": now - timedelta(minutes=bookings - i),
+                }
+            )
+            if len(rows) == 1000:
+                db.session.execute(db.insert(BookingRequest), rows)
+                rows = []
+        if rows:
+            db.session.execute(db.insert(BookingRequest), rows)
+        db.session.commit()
+
+        rebuild_availability_index()
+        recompute_booking_stats()
+        rebuild_calendar_feeds()
+
+        references = [
+            reference
+            for (reference,) in db.session.query(BookingRequest.reference_number)
+        ]
+        return venue_ids, references
+
+
+class Traffic:
+    """Builds one request of each kind"""
+
+    def __init__(self, app, venue_ids, references, rng):
+        self.app = app
+        self.venue_ids = venue_ids
+        self.references = references
+        self.rng = rng
+        self.today = date.today()
+
+    def _date(self):
+        return self.today + timedelta(days=self.rng.randrange(SEED_DAYS))
+
+    def book(self, client):
+        first = self.rng.randrange(SLOT_COUNT - 1)
+        start = SLOT_START_MINUTES + first * SLOT_LENGTH_MINUTES
+        return client.post(
+            "/book",
+            data={
+                "user_name": "Load Test",
+                "user_email": f"load{self.rng.randrange(1000)}@example.com",
+                "venue_id": self.rng.choice(self.venue_ids),
+                "event_date": self._date().isoformat(),
+                "start_time": _time(start),
+                "end_time": _time(start + SLOT_LENGTH_MINUTES),
+                "event_title": "Load test booking",
+            },
+        )
+
+    def venues(self, client):
+        span = self.rng.choice(["day", "week"])
+        return client.get(f"/venues?date={self._date().isoformat()}&span={span}")
+
+    def status(self, client):
+        return client.get(f"/api/booking-status/{self.rng.choice(self.references)}")
+
+    def dashboard(self, client):
+        return client.get("/admin/dashboard")
+
+    def export(self, client):
+        start = self._date()
+        response = client.get(
+            f"/admin/export?from={start.isoformat()}"
+            f"&to={(start + timedelta(days=7)).isoformat()}"
+        )
+        response.get_data()  # Drain the streamed CSV
+        response.close()  # As a WSGI server would, ending the request context
+        return response
+
+    def calendar(self, client):
+        """Batch-insert ten approved bookings into the fake Calendar API"""
+        from google.oauth2.credentials import Credentials
+        from calendar_service import CalendarService
+
+        with self.app.test_request_context():
+            bookings = (
+                BookingRequest.query.filter_by(status="approved")
+                .order_by(db.func.random())
+                .limit(10)
+                .all()
+            )
+            created, errors = CalendarService().create_calendar_events(
+                bookings, Credentials(token="loadtest")
+            )
+            db.session.remove()
+
+        class Result:
+            status_code = 500 if errors else 200
+
+        return Result()
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _summary(samples, duration):
+    latencies = sorted(latency for latency, ok in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for latency, ok in samples if not ok),
+        "throughput_rps": round(len(samples) / duration, 2) if duration else None,
+        "mean_ms": (
+            round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None
+        ),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+    }
+
+
+def run(app, traffic, mix, total, concurrency, seed_value):
+    routes = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in routes]
+    samples = {name: [] for name in routes}
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker(index):
+        rng = random.Random(seed_value * 1000 + index)
+        client = app.test_client()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            name = rng.choices(routes, weights)[0]
+            started = time.perf_counter()
+            try:
+                ok = getattr(traffic, name)(client).status_code < 400
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples[name].append((elapsed, ok))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    all_samples = [sample for values in samples.values() for sample in values]
+    return {
+        "duration_s": round(duration, 3),
+        "total": _summary(all_samples, duration),
+        "routes": {
+            name: _summary(values, duration) for name, values in samples.items()
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", help="default: a temporary SQLite file")
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--extra-venues", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--outbox-workers", type=int, default=2)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report to a file")
+    args = parser.parse_args()
+
+    mix = {
+        name: float(weight)
+        for name, weight in (item.split("=") for item in args.mix.split(","))
+    }
+    unknown = set(mix) - set(DEFAULT_MIX_NAMES)
+    if unknown:
+        parser.error(f"unknown routes in --mix: {', '.join(sorted(unknown))}")
+
+    smtp = SMTPSink()
+    calendar = FakeCalendarAPI()
+    for server in (smtp, calendar):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(tmpdir.name, 'loadtest.db')}"
+
+    app = create_app(_config(database_url, smtp.server_address[1], calendar.root_url))
+    rng = random.Random(args.seed)
+    seed_started = time.perf_counter()
+    venue_ids, references = seed(app, args.bookings, args.extra_venues, rng)
+    seed_duration = time.perf_counter() - seed_started
+
+    outbox = OutboxSenderPool(app, workers=args.outbox_workers)
+    outbox.start()
+
+    traffic = Traffic(app, venue_ids, references, rng)
+    if args.warmup:
+        run(app, traffic, mix, args.warmup, 1, args.seed)
+    results = run(app, traffic, mix, args.requests, args.concurrency, args.seed)
+
+    # Give the outbox senders a moment to hand queued mail to the sink
+    time.sleep(1)
+    report = {
+        "commit": _git_commit(),
+        "database": database_url.split(":", 1)[0],
+        "config": {
+            "bookings": args.bookings,
+            "venues": len(venue_ids),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "outbox_workers": args.outbox_workers,
+            "mix": mix,
+            "seed": args.seed,
+        },
+        "seed_s": round(seed_duration, 3),
+        **results,
+        "emails_delivered": smtp.messages,
+        "calendar_events": calendar.events,
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    outbox.stop(timeout=2)
+    smtp.shutdown()
+    calendar.shutdown()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
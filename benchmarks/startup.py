@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Worker start-up cost: import time, create_app and the first requests.
+
+Every run is a fresh interpreter, like a newly forked gunicorn worker
+without --preload. Prints the median of each phase as JSON.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--prewarm] [--bytecode-cache DIR]
+
+With --bytecode-cache the first run fills DIR and is left out of the
+medians, so they show a restart with a warm cache.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; the timings start before the app import
+PROBE = """
+import json, os, sys, time
+
+started = time.perf_counter()
+sys.path.insert(0, os.environ["STARTUP_ROOT"])
+from app import create_app
+from config import Config
+from database import init_database
+
+imported = time.perf_counter()
+
+
+class BenchConfig(Config):
+    SECRET_KEY = "benchmark"
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    MAIL_OUTBOX_WORKERS = 0
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get("STARTUP_BYTECODE_CACHE") or None
+    TEMPLATE_PREWARM = os.environ.get("STARTUP_PREWARM") == "1"
+
+
+app = create_app(BenchConfig)
+created = time.perf_counter()
+init_database(app)
+initialised = time.perf_counter()
+
+client = app.test_client()
+first = {}
+for url in ("/", "/venues", "/book"):
+    request_started = time.perf_counter()
+    client.get(url)
+    first[url] = time.perf_counter() - request_started
+
+print(json.dumps({
+    "import_s": imported - started,
+    "create_app_s": created - imported,
+    "init_database_s": initialised - created,
+    "first_requests_s": first,
+    "google_loaded": any(name.startswith("google") for name in sys.modules),
+}))
+"""
+
+
+def _run(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def _ms(values):
+    return round(statistics.median(values) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prewarm", action="store_true")
+    parser.add_argument("--bytecode-cache", metavar="DIR")
+    args = parser.parse_args()
+
+    env = dict(os.environ, STARTUP_ROOT=ROOT)
+    env["STARTUP_PREWARM"] = "1" if args.prewarm else "0"
+    if args.bytecode_cache:
+        env["STARTUP_BYTECODE_CACHE"] = os.path.abspath(args.bytecode_cache)
+        _run(env)  # Fill the cache
+
+    runs = [_run(env) for _ in range(args.runs)]
+    urls = list(runs[0]["first_requests_s"])
+    report = {
+        "runs": args.runs,
+        "prewarm": args.prewarm,
+        "bytecode_cache": bool(args.bytecode_cache),
+        "import_ms": _ms([run["import_s"] for run in runs]),
+        "create_app_ms": _ms([run["create_app_s"] for run in runs]),
+        "init_database_ms": _ms([run["init_database_s"] for run in runs]),
+        "first_request_ms": {
+            url: _ms([run["first_requests_s"][url] for run in runs]) for url in urls
+        },
+        "time_to_first_request_ms": _ms(
+            [
+                run["import_s"]
+                + run["create_app_s"]
+                + run["init_database_s"]
+                + run["first_requests_s"][urls[0]]
+                for run in runs
+            ]
+        ),
+        "google_loaded": any(run["google_loaded"] for run in runs),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Recurring booking series.
+
+A series is one BookingSeries row plus a pending BookingRequest for every
+occurrence. Conflicts for all occurrences come from one query over the
+availability bitmaps, the occurrences are inserted with one executemany,
+and an admin approves or rejects the whole series in one transaction with
+a single notification each way.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+from models import db, BookingRequest, BookingSeries, time_to_minutes
+from availability import conflicting_dates, reserve_dates, slot_mask
+from booking_stats import record_bookings_created, record_status_changes
+from ics_feeds import update_calendar_feeds
+from email_service import (
+    send_series_admin_notification,
+    send_series_user_notification,
+)
+from reference_numbers import generate_reference_number
+
+# Upper bound on occurrences, roughly two university terms of weekly sessions
+SERIES_MAX_OCCURRENCES = 52
+
+
+def parse_excluded_dates(text):
+    """Parse comma or whitespace separated YYYY-MM-DD dates; raises ValueError"""
+    return {
+        datetime.strptime(part, "%Y-%m-%d").date()
+        for part in (text or "").replace(",", " ").split()
+    }
+
+
+def format_excluded_dates(dates):
+    return ",".join(d.isoformat() for d in sorted(dates))
+
+
+def series_dates(first_date, until_date, interval_weeks, excluded=()):
+    """Return the occurrence dates from first_date through until_date"""
+    step = timedelta(weeks=interval_weeks)
+    dates = []
+    current = first_date
+    while current <= until_date:
+        if current not in excluded:
+            dates.append(current)
+        current += step
+    return dates
+
+
+def find_conflicts(venue_id, dates, start_time, end_time):
+    """Dates on which the series would overlap an approved booking"""
+    return conflicting_dates(venue_id, dates, slot_mask(start_time, end_time))
+
+
+def create_series(values, dates):
+    """Insert a series and its pending occurrences (the caller commits).
+
+    ``values`` holds user_name, user_email, venue_id, start_time, end_time,
+    event_title, event_description, interval_weeks and excluded_dates.
+    """
+    # All references come first: reserving a new block runs on a second
+    # connection, which SQLite would lock out once the flush below has
+    # taken the write lock
+    series_reference = generate_reference_number()
+    references = [generate_reference_number() for _ in dates]
+
+    series = BookingSeries(
+        series_id=str(uuid.uuid4()),
+        reference_number=series_reference,
+        first_date=dates[0],
+        until_date=dates[-1],
+        status="pending",
+        is_processed=False,
+        **values,
+    )
+    db.session.add(series)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    occurrence = {
+        key: values[key]
+        for key in (
+            "user_name",
+            "user_email",
+            "venue_id",
+            "start_time",
+            "end_time",
+            "event_title",
+            "event_description",
+        )
+    }
+    # Executemany bypasses the model validators that fill the minute columns
+    occurrence["start_minutes"] = time_to_minutes(values["start_time"])
+    occurrence["end_minutes"] = time_to_minutes(values["end_time"])
+    occurrences = [
+        dict(
+            occurrence,
+            booking_id=str(uuid.uuid4()),
+            reference_number=reference,
+            event_date=event_date,
+            status="pending",
+            is_processed=False,
+            created_at=now,
+            series_id=series.id,
+        )
+        for event_date, reference in zip(dates, references)
+    ]
+    db.session.execute(db.insert(BookingRequest), occurrences)
+    record_bookings_created({series.venue_id: len(occurrences)})
+    send_series_admin_notification(series, dates)
+    return series
+
+
+def review_series(series, action, admin_response):
+    """Approve or reject every open occurrence of a series at once.
+
+    Returns (bookings, conflicts). ``bookings`` is None when another admin
+    got there first; ``conflicts`` lists the dates that block an approval.
+    In either case the caller rolls back, otherwise it commits and the one
+    user notification goes out with the transaction.
+    """
+    now = datetime.utcnow()
+    # Claim the series the same way admin_review claims a single booking
+    result = db.session.execute(
+        db.update(BookingSeries)
+        .where(BookingSeries.id == series.id, BookingSeries.is_processed.isnot(True))
+        .values(
+            status=action,
+            admin_response=admin_response,
+            processed_at=now,
+            is_processed=True,
+        )
+    )
+    if result.rowcount != 1:
+        return None, []
+
+    # Occurrences already decided one by one keep their own outcome
+    bookings = BookingRequest.query.filter(
+        BookingRequest.series_id == series.id,
+        BookingRequest.is_processed.isnot(True),
+    ).all()
+    if not bookings:
+        return bookings, []
+
+    if action == "approved":
+        conflicts = reserve_dates(
+            series.venue_id,
+            [booking.event_date for booking in bookings],
+            slot_mask(series.start_time, series.end_time),
+        )
+        if conflicts:
+            return bookings, conflicts
+
+    ids = [booking.id for booking in bookings]
+    result = db.session.execute(
+        db.update(BookingRequest)
+        .where(BookingRequest.id.in_(ids), BookingRequest.is_processed.isnot(True))
+        .values(
+            status=action,
+            admin_response=admin_response,
+            processed_at=now,
+            is_processed=True,
+        ),
+        execution_options={"synchronize_session": "fetch"},
+    )
+    if result.rowcount != len(ids):
+        return None, []  # An occurrence was reviewed on its own meanwhile
+
+    record_status_changes(series.venue_id, "pending", action, len(ids))
+    update_calendar_feeds(bookings)
+    send_series_user_notification(series, bookings)
+    return bookings, []
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Incrementally maintained booking counts for the admin dashboard.
+
+Every booking creation and status change bumps one VenueBookingStats row
+in the same transaction, with an atomic ``col = col + 1`` UPDATE so
+concurrent requests don't lose counts. The dashboard then reads one row
+per venue instead of counting the whole bookings table.
+"""
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Venue, BookingRequest, ArchivedBooking, VenueBookingStats
+
+STATUSES = ("pending", "approved", "rejected")
+
+
+def _adjust(venue_id, **deltas):
+    values = {
+        status: getattr(VenueBookingStats, status) + delta
+        for status, delta in deltas.items()
+    }
+    update = (
+        db.update(VenueBookingStats)
+        .where(VenueBookingStats.venue_id == venue_id)
+        .values(**values)
+    )
+    if db.session.execute(update).rowcount:
+        return
+
+    # First booking for this venue: create its row. A concurrent insert of
+    # the same row makes the savepoint fail; the UPDATE then finds it.
+    try:
+        with db.session.begin_nested():
+            db.session.add(VenueBookingStats(venue_id=venue_id, **deltas))
+    except IntegrityError:
+        db.session.execute(update)
+
+
+def record_booking_created(booking):
+    """Count a new booking (the caller commits the session)"""
+    _adjust(booking.venue_id, **{booking.status or "pending": 1})
+
+
+def record_bookings_created(counts):
+    """Count a batch of new pending bookings, given as {venue_id: count}"""
+    for venue_id, count in counts.items():
+        _adjust(venue_id, pending=count)
+
+
+def record_status_change(booking, old_status):
+    """Move a booking between status counters (the caller commits the session)"""
+    if old_status == booking.status:
+        return
+    _adjust(booking.venue_id, **{old_status: -1, booking.status: 1})
+
+
+def record_status_changes(venue_id, old_status, new_status, count):
+    """Move ``count`` bookings of one venue between status counters"""
+    if count and old_status != new_status:
+        _adjust(venue_id, **{old_status: -count, new_status: count})
+
+
+def get_dashboard_stats():
+    """Return (totals, venue popularity) from a single read of the stats table"""
+    rows = (
+        db.session.query(
+            Venue.name,
+            VenueBookingStats.pending,
+            VenueBookingStats.approved,
+            VenueBookingStats.rejected,
+        )
+        .join(VenueBookingStats, VenueBookingStats.venue_id == Venue.id)
+        .all()
+    )
+
+    stats = {"total": 0, "pending": 0, "approved": 0, "rejected": 0}
+    venue_stats = []
+    for name, pending, approved, rejected in rows:
+        booking_count = pending + approved + rejected
+        stats["pending"] += pending
+        stats["approved"] += approved
+        stats["rejected"] += rejected
+        stats["total"] += booking_count
+        if booking_count:
+            venue_stats.append({"name": name, "booking_count": booking_count})
+
+    venue_stats.sort(key=lambda v: v["booking_count"], reverse=True)
+    return stats, venue_stats
+
+
+def recompute_booking_stats():
+    """Recount every counter with one GROUP BY per bookings table.
+
+    The counters are locked first with a no-op UPDATE, so bookings created
+    or reviewed meanwhile wait in their _adjust and are counted either by
+    the GROUP BY or by their own increment afterwards, never lost. Only the
+    counters that were off are rewritten. Archived bookings keep counting
+    towards the totals.
+
+    Returns {venue_id: {status: (stored, counted)}} for every mismatch.
+    """
+    db.session.execute(
+        db.update(VenueBookingStats).values(pending=VenueBookingStats.pending)
+    )
+    stored = {
+        row.venue_id: {status: getattr(row, status) for status in STATUSES}
+        for row in VenueBookingStats.query
+    }
+
+    counts = {
+        venue_id: dict.fromkeys(STATUSES, 0)
+        for (venue_id,) in db.session.query(Venue.id)
+    }
+    for model in (BookingRequest, ArchivedBooking):
+        rows = db.session.query(
+            model.venue_id, model.status, db.func.count(model.id)
+        ).group_by(model.venue_id, model.status)
+        for venue_id, status, count in rows:
+            if status in STATUSES:
+                venue_counts = counts.setdefault(venue_id, dict.fromkeys(STATUSES, 0))
+                venue_counts[status] += count
+
+    differences = {}
+    for venue_id, venue_counts in counts.items():
+        old = stored.get(venue_id, dict.fromkeys(STATUSES, 0))
+        changed = {
+            status: (old[status], count)
+            for status, count in venue_counts.items()
+            if old[status] != count
+        }
+        if venue_id not in stored:
+            db.session.add(VenueBookingStats(venue_id=venue_id, **venue_counts))
+        elif changed:
+            db.session.execute(
+                db.update(VenueBookingStats)
+                .where(VenueBookingStats.venue_id == venue_id)
+                .values(**venue_counts)
+            )
+        if changed:
+            differences[venue_id] = changed
+    db.session.commit()
+    return differences
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Bulk booking ingestion from CSV or JSONL files.
+
+A whole term schedule is checked with one query for the approved-slot
+bitmaps of every (venue, date) it touches. Rows are also checked against
+each other, inserted with a single executemany and reported to the admin
+in one summary email.
+
+Each row needs user_name, user_email, event_date (YYYY-MM-DD),
+start_time/end_time (HH:MM on the 30-minute grid), event_title and either
+venue_id or venue (the venue name); event_description is optional.
+"""
+
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+
+import click
+from flask import current_app, url_for
+from flask_mail import Message
+
+from models import db, BookingRequest, VenueAvailability, time_to_minutes
+from availability import (
+    minutes_mask,
+    SLOT_COUNT,
+    SLOT_LENGTH_MINUTES,
+    SLOT_START_MINUTES,
+)
+from booking_stats import record_bookings_created
+from email_outbox import queue_message, sends_queued_mail
+from reference_numbers import generate_reference_number
+from venue_cache import get_venue, get_venues
+
+SLOT_END_MINUTES = SLOT_START_MINUTES + SLOT_COUNT * SLOT_LENGTH_MINUTES
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = []  # Reference numbers of the inserted bookings
+        self.errors = []  # (row number, message)
+
+
+class _InvalidLine:
+    """A JSONL line that is not valid JSON, kept in place of its row"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _json_line(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return _InvalidLine(e)
+
+
+def parse_rows(stream, filename=""):
+    """Read booking rows from a CSV or JSONL text stream"""
+    text = stream.read()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8-sig")
+    if filename.endswith((".jsonl", ".json")) or text.lstrip().startswith("{"):
+        # A broken line becomes a row error instead of rejecting the file
+        return [_json_line(line) for line in text.splitlines() if line.strip()]
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _text(row, field, required=True):
+    """A string field of the row; JSONL values can be of any JSON type"""
+    value = row.get(field)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+
+def _to_booking(row):
+    """Validate one row and turn it into insert values; raises ValueError"""
+    # A JSONL line can hold any JSON value, not only an object
+    if not isinstance(row, dict):
+        raise ValueError("expected an object with the booking fields")
+
+    venue = None
+    if row.get("venue_id"):
+        venue = get_venue(int(row["venue_id"]))
+    elif row.get("venue"):
+        venue = next((v for v in get_venues() if v.name == row["venue"]), None)
+    if venue is None:
+        raise ValueError("unknown venue")
+
+    for field in ("user_name", "user_email", "event_title"):
+        if not _text(row, field).strip():
+            raise ValueError(f"{field} is required")
+
+    event_date = datetime.strptime(_text(row, "event_date"), "%Y-%m-%d").date()
+    start_minutes = time_to_minutes(_text(row, "start_time"))
+    end_minutes = time_to_minutes(_text(row, "end_time"))
+    if (
+        start_minutes % SLOT_LENGTH_MINUTES
+        or end_minutes % SLOT_LENGTH_MINUTES
+        or not SLOT_START_MINUTES <= start_minutes < end_minutes <= SLOT_END_MINUTES
+    ):
+        raise ValueError("times must be on the 09:00 - 21:00 half-hour grid")
+
+    return {
+        "user_name": row["user_name"].strip(),
+        "user_email": row["user_email"].strip(),
+        "venue_id": venue.id,
+        "event_date": event_date,
+        "start_time": f"{start_minutes // 60:02d}:{start_minutes % 60:02d}",
+        "end_time": f"{end_minutes // 60:02d}:{end_minutes % 60:02d}",
+        "start_minutes": start_minutes,
+        "end_minutes": end_minutes,
+        "event_title": row["event_title"].strip(),
+        "event_description": _text(row, "event_description", required=False),
+    }
+
+
+def import_bookings(rows, dry_run=False):
+    """Validate, conflict-check and insert a batch of booking rows"""
+    result = ImportResult()
+
+    candidates = []
+    for number, row in enumerate(rows, start=1):
+        if isinstance(row, _InvalidLine):
+            result.errors.append((number, f"invalid JSON: {row.error}"))
+            continue
+        try:
+            candidates.append((number, _to_booking(row)))
+        except (KeyError, ValueError, TypeError) as e:
+            result.errors.append((number, f"invalid row: {e}"))
+
+    # Approved-slot bitmaps of every (venue, date) in the batch, in one query
+    keys = {(values["venue_id"], values["event_date"]) for _, values in candidates}
+    taken = {}
+    if keys:
+        taken = {
+            (venue_id, event_date): mask
+            for venue_id, event_date, mask in db.session.query(
+                VenueAvailability.venue_id,
+                VenueAvailability.event_date,
+                VenueAvailability.slot_mask,
+            ).filter(
+                db.tuple_(VenueAvailability.venue_id, VenueAvailability.event_date).in_(
+                    keys
+                )
+            )
+        }
+
+    # Slots claimed by earlier rows of this batch
+    claimed = {}
+    accepted = []
+    for number, values in candidates:
+        key = (values["venue_id"], values["event_date"])
+        mask = minutes_mask(values["start_minutes"], values["end_minutes"])
+        if taken.get(key, 0) & mask:
+            result.errors.append((number, "conflicts with an approved booking"))
+        elif claimed.get(key, 0) & mask:
+            result.errors.append((number, "conflicts with another row in the batch"))
+        else:
+            claimed[key] = claimed.get(key, 0) | mask
+            accepted.append(values)
+
+    result.errors.sort()
+    if dry_run or not accepted:
+        return result
+
+    now = datetime.utcnow()
+    for values in accepted:
+        values.update(
+            booking_id=str(uuid.uuid4()),
+            reference_number=generate_reference_number(),
+            status="pending",
+            is_processed=False,
+            created_at=now,
+        )
+    db.session.execute(db.insert(BookingRequest), accepted)
+
+    counts = {}
+    for values in accepted:
+        counts[values["venue_id"]] = counts.get(values["venue_id"], 0) + 1
+    record_bookings_created(counts)
+
+    result.created = [values["reference_number"] for values in accepted]
+    _queue_summary(result)
+    db.session.commit()
+    return result
+
+
+def _queue_summary(result):
+    """Queue one admin email for the whole import"""
+    msg = Message(
+        subject=f"Bulk Import - {len(result.created)} new booking requests",
+        sender=current_app.config["MAIL_USERNAME"],
+        recipients=[current_app.config["ADMIN_EMAIL"]],
+    )
+    lines = [f"{len(result.created)} booking requests were imported:", ""]
+    lines += result.created
+    if result.errors:
+        lines += ["", f"{len(result.errors)} rows were skipped:"]
+        lines += [f"Row {number}: {message}" for number, message in result.errors]
+    try:
+        dashboard_url = url_for("main.admin_dashboard", _external=True)
+        lines += ["", f"Review them from the dashboard: {dashboard_url}"]
+    except RuntimeError:
+        pass  # No request context or SERVER_NAME when run from the CLI
+    msg.body = "\n".join(lines)
+    queue_message(msg)
+
+
+def register_cli(app):
+    @app.cli.command("import-bookings")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--dry-run", is_flag=True, help="Only validate and check conflicts")
+    @sends_queued_mail
+    def import_bookings_command(path, dry_run):
+        """Import booking requests from a CSV or JSONL file."""
+        with open(path, encoding="utf-8-sig") as f:
+            rows = parse_rows(f, path)
+        result = import_bookings(rows, dry_run=dry_run)
+        for number, message in result.errors:
+            click.echo(f"Row {number}: {message}", err=True)
+        if dry_run:
+            click.echo(f"{len(rows) - len(result.errors)} rows would be imported")
+        else:
+            click.echo(f"Imported {len(result.created)} bookings")
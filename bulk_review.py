@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Bulk review of pending booking requests.
+
+The queue lists pending requests oldest first with keyset pagination on
+(created_at, id). A batch of selected requests is decided in one
+transaction: approvals are checked against the availability bitmaps and
+each other with one query, the slots are reserved together, pending
+requests that overlap a new approval are rejected along with them, and
+every customer email is queued in the same flush.
+"""
+
+from collections import Counter
+from datetime import datetime
+
+from models import db, BookingRequest, VenueAvailability
+from availability import minutes_mask, reserve_masks
+from booking_stats import record_status_changes
+from email_service import send_user_notification
+from ics_feeds import update_calendar_feeds
+
+QUEUE_PAGE_SIZE = 50
+CONFLICT_RESPONSE = (
+    "Request rejected: the venue has been booked for an overlapping time slot."
+)
+
+
+class ReviewResult:
+    def __init__(self):
+        self.approved = []  # Bookings approved as selected
+        self.rejected = []  # Bookings rejected as selected
+        self.auto_rejected = []  # Pending bookings that lost their slot
+        self.skipped = 0  # Selected bookings that were no longer pending
+        self.stale = False  # Someone else changed the selection meanwhile
+
+    @property
+    def processed(self):
+        return self.approved + self.rejected + self.auto_rejected
+
+
+def encode_cursor(booking):
+    return f"{booking.created_at.isoformat()}_{booking.id}"
+
+
+def decode_cursor(cursor):
+    """Parse a queue cursor; raises ValueError"""
+    created_at, booking_id = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(created_at), int(booking_id)
+
+
+def pending_queue(after=None, limit=QUEUE_PAGE_SIZE):
+    """One page of pending requests after the cursor, plus the next cursor"""
+    query = BookingRequest.query.options(db.joinedload(BookingRequest.venue)).filter(
+        BookingRequest.status == "pending", BookingRequest.is_processed.isnot(True)
+    )
+    if after:
+        created_at, booking_id = after
+        query = query.filter(
+            db.tuple_(BookingRequest.created_at, BookingRequest.id)
+            > db.tuple_(created_at, booking_id)
+        )
+    bookings = (
+        query.order_by(BookingRequest.created_at, BookingRequest.id)
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(bookings) > limit:
+        bookings = bookings[:limit]
+        next_cursor = encode_cursor(bookings[-1])
+    return bookings, next_cursor
+
+
+def _booking_mask(booking):
+    return minutes_mask(booking.start_minutes, booking.end_minutes)
+
+
+def _mark(bookings, status, admin_response, now):
+    """Move still-unprocessed bookings to a final status with one UPDATE"""
+    if not bookings:
+        return True
+    result = db.session.execute(
+        db.update(BookingRequest)
+        .where(
+            BookingRequest.id.in_([booking.id for booking in bookings]),
+            BookingRequest.is_processed.isnot(True),
+        )
+        .values(
+            status=status,
+            admin_response=admin_response,
+            processed_at=now,
+            is_processed=True,
+        ),
+        execution_options={"synchronize_session": "fetch"},
+    )
+    return result.rowcount == len(bookings)
+
+
+def review_bookings(booking_ids, action, admin_response=None):
+    """Approve or reject the selected bookings in one transaction.
+
+    Returns a ReviewResult. If ``stale`` is set the caller rolls back,
+    otherwise it commits and publishes the status changes.
+    """
+    result = ReviewResult()
+    selected = (
+        BookingRequest.query.filter(
+            BookingRequest.booking_id.in_(booking_ids),
+            BookingRequest.is_processed.isnot(True),
+        )
+        .order_by(BookingRequest.created_at, BookingRequest.id)
+        .all()
+    )
+    result.skipped = len(set(booking_ids)) - len(selected)
+    if not selected:
+        return result
+
+    now = datetime.utcnow()
+    if action == "rejected":
+        result.rejected = selected
+    else:
+        # Approved bitmaps of every (venue, date) in the selection, in one query
+        keys = {(b.venue_id, b.event_date) for b in selected}
+        taken = {
+            (venue_id, event_date): mask
+            for venue_id, event_date, mask in db.session.query(
+                VenueAvailability.venue_id,
+                VenueAvailability.event_date,
+                VenueAvailability.slot_mask,
+            ).filter(
+                db.tuple_(VenueAvailability.venue_id, VenueAvailability.event_date).in_(
+                    keys
+                )
+            )
+        }
+
+        # Oldest request first; a later one that overlaps it loses its slot
+        claimed = {}
+        for booking in selected:
+            key = (booking.venue_id, booking.event_date)
+            mask = _booking_mask(booking)
+            if (taken.get(key, 0) | claimed.get(key, 0)) & mask:
+                result.auto_rejected.append(booking)
+            else:
+                claimed[key] = claimed.get(key, 0) | mask
+                result.approved.append(booking)
+
+        if claimed:
+            if not reserve_masks(claimed):
+                result.stale = True
+                return result
+
+            # Unselected pending requests that now overlap an approval
+            selected_ids = [booking.id for booking in selected]
+            candidates = BookingRequest.query.filter(
+                db.tuple_(BookingRequest.venue_id, BookingRequest.event_date).in_(
+                    list(claimed)
+                ),
+                BookingRequest.status == "pending",
+                BookingRequest.is_processed.isnot(True),
+                BookingRequest.id.notin_(selected_ids),
+            ).all()
+            result.auto_rejected += [
+                booking
+                for booking in candidates
+                if claimed[(booking.venue_id, booking.event_date)]
+                & _booking_mask(booking)
+            ]
+
+    response = admin_response or f"Request {action} by admin"
+    if not (
+        _mark(result.approved, "approved", response, now)
+        and _mark(result.rejected, "rejected", response, now)
+        and _mark(result.auto_rejected, "rejected", CONFLICT_RESPONSE, now)
+    ):
+        result.stale = True
+        return result
+
+    counts = Counter((booking.venue_id, booking.status) for booking in result.processed)
+    for (venue_id, status), count in counts.items():
+        record_status_changes(venue_id, "pending", status, count)
+    update_calendar_feeds(result.processed)
+
+    # All emails go into the outbox with the same flush
+    for booking in result.processed:
+        send_user_notification(booking)
+    return result
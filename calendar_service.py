@@ -1,8 +1,56 @@
 from flask import current_app, session, request
+import functools
 import json
 import os
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from venue_cache import get_venue
+from metrics import timed
+
+# Google recommends at most 50 calls per Calendar batch request
+CALENDAR_BATCH_SIZE = 50
+
+
+@functools.lru_cache(maxsize=None)
+def _discovery_document(root_url=None):
+    """Parse the shipped Calendar v3 discovery document, once per root URL.
+
+    GOOGLE_CALENDAR_ROOT_URL points the service (including batch requests)
+    at another host, e.g. a local stand-in for the Calendar API.
+    """
+    document = json.loads(get_static_doc("calendar", "v3"))
+    if root_url:
+        document = dict(document, rootUrl=root_url, mtlsRootUrl=root_url)
+    return document
+
+
+def get_calendar_service(credentials):
+    """Build a Calendar service authorized with these credentials.
+
+    Only the parsed discovery document is shared. Building the service from
+    it is cheap, so each request gets its own and no user's credentials
+    outlive the request that used them.
+    """
+    root_url = current_app.config.get("GOOGLE_CALENDAR_ROOT_URL")
+    return build_from_document(_discovery_document(root_url), credentials=credentials)
+
+
+def _event_body(booking):
+    venue = get_venue(booking.venue_id)
+    return {
+        "summary": booking.event_title,
+        "description": f"{booking.event_description}\nVenue: {venue.name}\nReference: {booking.reference_number}",
+        "start": {
+            "dateTime": f"{booking.event_date}T{booking.start_time}:00",
+            "timeZone": "UTC",
+        },
+        "end": {
+            "dateTime": f"{booking.event_date}T{booking.end_time}:00",
+            "timeZone": "UTC",
+        },
+        "location": venue.location,
+    }
 
 
 class CalendarService:
@@ -23,6 +71,7 @@ class CalendarService:
             }
         }
 
+    @timed("calendar.get_authorization_url", "calendar")
     def get_authorization_url(self):
         """Get Google OAuth authorization URL"""
         flow = Flow.from_client_config(
@@ -37,6 +86,7 @@ class CalendarService:
         session["state"] = state
         return authorization_url
 
+    @timed("calendar.handle_oauth_callback", "calendar")
     def handle_oauth_callback(self):
         """Handle OAuth callback and return credentials"""
         flow = Flow.from_client_config(
@@ -52,27 +102,56 @@ class CalendarService:
 
         return flow.credentials
 
+    @timed("calendar.create_calendar_event", "calendar")
     def create_calendar_event(self, booking, credentials):
         """Create a calendar event for the booking"""
         try:
-            service = build("calendar", "v3", credentials=credentials)
-
-            event = {
-                "summary": booking.event_title,
-                "description": f"{booking.event_description}\nVenue: {booking.venue.name}\nReference: {booking.reference_number}",
-                "start": {
-                    "dateTime": f"{booking.event_date}T{booking.start_time}:00",
-                    "timeZone": "UTC",
-                },
-                "end": {
-                    "dateTime": f"{booking.event_date}T{booking.end_time}:00",
-                    "timeZone": "UTC",
-                },
-                "location": booking.venue.location,
-            }
-
-            event = service.events().insert(calendarId="primary", body=event).execute()
+            service = get_calendar_service(credentials)
+            service.events().insert(
+                calendarId="primary", body=_event_body(booking)
+            ).execute()
             return True, "Event added to calendar successfully"
         except Exception as e:
             current_app.logger.error(f"Error creating calendar event: {e}")
             return False, f"Error adding to calendar: {str(e)}"
+
+    @timed("calendar.create_calendar_events", "calendar")
+    def create_calendar_events(self, bookings, credentials):
+        """Create events for many bookings with HTTP batch requests.
+
+        Up to CALENDAR_BATCH_SIZE inserts share one round trip. Returns
+        (number created, {reference_number: error message}).
+        """
+        created = set()
+        errors = {}
+
+        def _callback(request_id, response, exception):
+            if exception is None:
+                created.add(request_id)
+            else:
+                current_app.logger.error(
+                    f"Error creating calendar event {request_id}: {exception}"
+                )
+                errors[request_id] = f"Error adding to calendar: {exception}"
+
+        try:
+            service = get_calendar_service(credentials)
+            for i in range(0, len(bookings), CALENDAR_BATCH_SIZE):
+                batch = service.new_batch_http_request(callback=_callback)
+                for booking in bookings[i : i + CALENDAR_BATCH_SIZE]:
+                    batch.add(
+                        service.events().insert(
+                            calendarId="primary", body=_event_body(booking)
+                        ),
+                        request_id=booking.reference_number,
+                    )
+                batch.execute()
+        except Exception as e:
+            current_app.logger.error(f"Error creating calendar events: {e}")
+            # Batches that already went through keep their results
+            for booking in bookings:
+                if booking.reference_number not in created:
+                    errors.setdefault(
+                        booking.reference_number, f"Error adding to calendar: {str(e)}"
+                    )
+        return len(created), errors
@@ -5,6 +5,21 @@ class Config:
     SECRET_KEY = getenv("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool of each engine; the size settings don't apply to SQLite
+    DB_POOL_SIZE = int(getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(getenv("DB_POOL_TIMEOUT", 30))
+    # Seconds before a pooled connection is replaced (-1 keeps it forever)
+    DB_POOL_RECYCLE = int(getenv("DB_POOL_RECYCLE", -1))
+    DB_POOL_PRE_PING = getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true")
+    # Milliseconds before Postgres cancels a statement (0 disables it)
+    DB_STATEMENT_TIMEOUT = int(getenv("DB_STATEMENT_TIMEOUT", 0))
+
+    # Comma-separated replica URLs for the read-only routes, and how long a
+    # browser keeps reading from the primary after it wrote something
+    DATABASE_REPLICA_URLS = getenv("DATABASE_REPLICA_URLS")
+    REPLICA_STICKY_SECONDS = int(getenv("REPLICA_STICKY_SECONDS", 10))
     OAUTHLIB_INSECURE_TRANSPORT = getenv("OAUTHLIB_INSECURE_TRANSPORT")
 
     # Email configuration
@@ -15,7 +30,47 @@ class Config:
     MAIL_PASSWORD = getenv("MAIL_PASSWORD")
     ADMIN_EMAIL = getenv("ADMIN_EMAIL")
 
+    # Email outbox: background sender threads per process (0 disables them)
+    MAIL_OUTBOX_WORKERS = int(getenv("MAIL_OUTBOX_WORKERS", 2))
+    MAIL_OUTBOX_BATCH_SIZE = int(getenv("MAIL_OUTBOX_BATCH_SIZE", 50))
+    MAIL_OUTBOX_POLL_INTERVAL = float(getenv("MAIL_OUTBOX_POLL_INTERVAL", 2))
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(getenv("MAIL_OUTBOX_MAX_ATTEMPTS", 5))
+    MAIL_OUTBOX_RETRY_BACKOFF = float(getenv("MAIL_OUTBOX_RETRY_BACKOFF", 30))
+
+    # Booking status long-poll. Set a Redis URL to share status changes
+    # between several worker processes. Each waiting status page holds a
+    # worker thread for up to STATUS_POLL_TIMEOUT seconds.
+    STATUS_PUBSUB_URL = getenv("STATUS_PUBSUB_URL")
+    STATUS_POLL_TIMEOUT = float(getenv("STATUS_POLL_TIMEOUT", 10))
+    STATUS_PUBSUB_RETRY_MAX = float(getenv("STATUS_PUBSUB_RETRY_MAX", 30))
+
+    # Seconds before the in-process venue catalog is reloaded from the DB
+    VENUE_CACHE_TTL = int(getenv("VENUE_CACHE_TTL", 300))
+
+    # Key of the booking reference permutation (defaults to SECRET_KEY, so
+    # set it to keep SECRET_KEY rotatable). Never change it once bookings
+    # exist; the app refuses to hand out references with a different key.
+    REFERENCE_KEY = getenv("REFERENCE_KEY")
+    # Sequence numbers each process reserves per database round trip
+    REFERENCE_BLOCK_SIZE = int(getenv("REFERENCE_BLOCK_SIZE", 100))
+
+    # Directory for compiled template bytecode shared across worker restarts,
+    # and whether create_app compiles every template up front
+    JINJA_BYTECODE_CACHE_DIR = getenv("JINJA_BYTECODE_CACHE_DIR")
+    TEMPLATE_PREWARM = getenv("TEMPLATE_PREWARM", "false").lower() in ("1", "true")
+
+    # Processed bookings of events older than this many days are moved to the
+    # archive table by `flask archive-bookings`, this many rows per transaction
+    ARCHIVE_AFTER_DAYS = int(getenv("ARCHIVE_AFTER_DAYS", 365))
+    ARCHIVE_BATCH_SIZE = int(getenv("ARCHIVE_BATCH_SIZE", 1000))
+
+    # Per-request SQL/template/email/Calendar timing, sent as a Server-Timing
+    # header and served as Prometheus text at /admin/metrics
+    METRICS_ENABLED = getenv("METRICS_ENABLED", "false").lower() in ("1", "true")
+
     # Google Calendar API configuration
     GOOGLE_CLIENT_ID = getenv("GOOGLE_CLIENT_ID")
     GOOGLE_CLIENT_SECRET = getenv("GOOGLE_CLIENT_SECRET")
     REDIRECT_URI = getenv("REDIRECT_URI")
+    # Calendar API root, e.g. http://127.0.0.1:8085/ for a local stand-in
+    GOOGLE_CALENDAR_ROOT_URL = getenv("GOOGLE_CALENDAR_ROOT_URL")
@@ -1,9 +1,75 @@
-from models import db, Venue
+from models import db, Venue, BookingRequest
+from availability import rebuild_availability_index
+from booking_stats import recompute_booking_stats
+from ics_feeds import rebuild_calendar_feeds
+from reference_numbers import check_reference_key
+
+# Indexes that earlier versions created and the composite ones replace
+SUPERSEDED_INDEXES = ("ix_booking_request_created_at", "ix_booking_request_status")
+
+
+def migrate_database():
+    """Bring an existing database up to date with the current models"""
+    inspector = db.inspect(db.engine)
+    columns = {c["name"] for c in inspector.get_columns("booking_request")}
+
+    with db.engine.begin() as conn:
+        # Integer minute columns backing the SQL overlap check
+        for name in ("start_minutes", "end_minutes"):
+            if name not in columns:
+                conn.execute(
+                    db.text(f"ALTER TABLE booking_request ADD COLUMN {name} INTEGER")
+                )
+
+        # Link from an occurrence to its recurring series
+        if "series_id" not in columns:
+            conn.execute(
+                db.text(
+                    "ALTER TABLE booking_request ADD COLUMN series_id INTEGER "
+                    "REFERENCES booking_series (id)"
+                )
+            )
+
+        # Backfill rows created before the columns existed (HH:MM strings)
+        conn.execute(
+            db.text(
+                "UPDATE booking_request SET "
+                "start_minutes = CAST(substr(start_time, 1, 2) AS INTEGER) * 60"
+                " + CAST(substr(start_time, 4, 2) AS INTEGER), "
+                "end_minutes = CAST(substr(end_time, 1, 2) AS INTEGER) * 60"
+                " + CAST(substr(end_time, 4, 2) AS INTEGER) "
+                "WHERE start_minutes IS NULL OR end_minutes IS NULL"
+            )
+        )
+
+    # Fingerprint of the reference key, checked before reserving numbers
+    sequence_columns = {c["name"] for c in inspector.get_columns("reference_sequence")}
+    if "key_fingerprint" not in sequence_columns:
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.text(
+                    "ALTER TABLE reference_sequence ADD COLUMN key_fingerprint VARCHAR(16)"
+                )
+            )
+
+    indexes = {index["name"] for index in inspector.get_indexes("booking_request")}
+    with db.engine.begin() as conn:
+        for name in SUPERSEDED_INDEXES:
+            if name in indexes:
+                conn.execute(db.text(f"DROP INDEX {name}"))
+
+    # create_all() skips indexes on tables that already exist
+    for index in BookingRequest.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
 
 
 def init_database(app):
     with app.app_context():
-        db.create_all()
+        # The primary only: replicas get the schema through replication
+        db.create_all(bind_key=None)
+        migrate_database()
+        # Refuse to start with a reference key other than the one in use
+        check_reference_key()
 
         # Add venues if none exist
         if Venue.query.count() == 0:
@@ -41,3 +107,10 @@ def init_database(app):
             for venue in venues:
                 db.session.add(venue)
             db.session.commit()
+
+        # Rebuild the slot bitmaps from the approved bookings
+        rebuild_availability_index()
+        # Recount the dashboard statistics
+        recompute_booking_stats()
+        # Re-render the venue and customer calendar feeds
+        rebuild_calendar_feeds()
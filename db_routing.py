@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Engine pool settings and read-replica routing.
+
+configure_engines turns the DB_POOL_* settings into engine options and
+registers every URL in DATABASE_REPLICA_URLS as a "replica_<n>" bind.
+Views decorated with ``read_only`` run their queries on one replica,
+except for flushes and INSERT/UPDATE/DELETE statements, which always go
+to the primary. A response to a request that wrote anything sets a
+short-lived cookie, and while it lasts that browser reads from the
+primary too, so the redirect after booking or reviewing shows the change
+even if the replicas lag behind.
+"""
+
+import random
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND_PREFIX = "replica_"
+PRIMARY_COOKIE = "read_primary"
+
+
+def engine_options(url, config):
+    """Pool and timeout options for the engine of one database URL"""
+    options = {
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+    }
+    backend = make_url(url).get_backend_name()
+    # SQLite engines get their pool class from Flask-SQLAlchemy and the driver
+    if backend != "sqlite":
+        options.update(
+            pool_size=config["DB_POOL_SIZE"],
+            max_overflow=config["DB_MAX_OVERFLOW"],
+            pool_timeout=config["DB_POOL_TIMEOUT"],
+        )
+    if backend == "postgresql" and config["DB_STATEMENT_TIMEOUT"]:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"
+        }
+    return options
+
+
+def configure_engines(app):
+    """Fill in engine options and replica binds; call before db.init_app"""
+    config = app.config
+    if config["SQLALCHEMY_DATABASE_URI"]:
+        options = engine_options(config["SQLALCHEMY_DATABASE_URI"], config)
+        # Options set explicitly in a config class take precedence
+        options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+        config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    urls = [
+        url.strip()
+        for url in (config["DATABASE_REPLICA_URLS"] or "").split(",")
+        if url.strip()
+    ]
+    binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+    replicas = []
+    for i, url in enumerate(urls):
+        key = f"{REPLICA_BIND_PREFIX}{i}"
+        binds[key] = {"url": url, **engine_options(url, config)}
+        replicas.append(key)
+    config["SQLALCHEMY_BINDS"] = binds
+    app.extensions["db_replicas"] = replicas
+
+    if replicas:
+
+        @app.after_request
+        def _read_own_writes(response):
+            if g.get("db_wrote"):
+                response.set_cookie(
+                    PRIMARY_COOKIE,
+                    "1",
+                    max_age=config["REPLICA_STICKY_SECONDS"],
+                    httponly=True,
+                    samesite="Lax",
+                )
+            return response
+
+    return replicas
+
+
+def read_only(view):
+    """Run the view's queries on a replica unless this browser wrote recently"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.extensions.get("db_replicas")
+        if replicas and PRIMARY_COOKIE not in request.cookies:
+            # One replica per request, so all its reads see the same state
+            g.db_replica = random.choice(replicas)
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Session that sends reads of read_only views to their replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or getattr(clause, "is_dml", False):
+                g.db_wrote = True
+            elif "db_replica" in g:
+                return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
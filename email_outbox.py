@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Durable email outbox drained by a pool of background sender threads.
+
+Request handlers only insert an EmailOutbox row next to the booking change
+it reports, so the SMTP round trip never blocks a web worker. Sender
+threads claim due rows with a conditional UPDATE (safe across threads and
+gunicorn processes), deliver a whole batch over one SMTP connection and
+reschedule failures with exponential backoff.
+
+The threads start with the first request each process serves, never in
+create_app, so a gunicorn --preload master has no threads or pooled
+connections to fork into its workers. CLI commands that queue mail run no
+threads either; they send it synchronously before exiting (see
+sends_queued_mail), so nothing waits for the next web request.
+"""
+
+import functools
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+
+from models import db, EmailOutbox
+from metrics import timed
+
+# A claim older than this is assumed to belong to a crashed sender
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def queue_message(msg):
+    """Add a Flask-Mail message to the outbox (the caller commits the session)"""
+    entry = EmailOutbox(
+        subject=msg.subject,
+        sender=msg.sender,
+        recipients=json.dumps(list(msg.recipients)),
+        body=msg.body,
+        html=msg.html,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.session.add(entry)
+    return entry
+
+
+def _to_message(entry):
+    return Message(
+        subject=entry.subject,
+        sender=entry.sender,
+        recipients=json.loads(entry.recipients),
+        body=entry.body,
+        html=entry.html,
+    )
+
+
+def _claim_batch(batch_size):
+    """Atomically claim up to batch_size due messages for this sender"""
+    now = datetime.utcnow()
+    candidates = (
+        db.session.query(EmailOutbox.id)
+        .filter(
+            db.or_(
+                db.and_(
+                    EmailOutbox.status == "pending",
+                    EmailOutbox.next_attempt_at <= now,
+                ),
+                db.and_(
+                    EmailOutbox.status == "sending",
+                    EmailOutbox.locked_at < now - CLAIM_TIMEOUT,
+                ),
+            )
+        )
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(batch_size)
+        .all()
+    )
+
+    claimed = []
+    for (entry_id,) in candidates:
+        # Only one sender can win the status transition for a given row
+        result = db.session.execute(
+            db.update(EmailOutbox)
+            .where(
+                EmailOutbox.id == entry_id,
+                db.or_(
+                    EmailOutbox.status == "pending",
+                    db.and_(
+                        EmailOutbox.status == "sending",
+                        EmailOutbox.locked_at < now - CLAIM_TIMEOUT,
+                    ),
+                ),
+            )
+            .values(status="sending", locked_at=now)
+        )
+        if result.rowcount == 1:
+            claimed.append(entry_id)
+    db.session.commit()
+
+    if not claimed:
+        return []
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).all()
+
+
+def _record_failure(entry, error):
+    max_attempts = current_app.config["MAIL_OUTBOX_MAX_ATTEMPTS"]
+    backoff = current_app.config["MAIL_OUTBOX_RETRY_BACKOFF"]
+
+    entry.attempts = (entry.attempts or 0) + 1
+    entry.last_error = str(error)
+    entry.locked_at = None
+    if entry.attempts >= max_attempts:
+        entry.status = "failed"
+        current_app.logger.error(
+            f"Giving up on email {entry.id} after {entry.attempts} attempts: {error}"
+        )
+    else:
+        entry.status = "pending"
+        entry.next_attempt_at = datetime.utcnow() + timedelta(
+            seconds=backoff * 2 ** (entry.attempts - 1)
+        )
+
+
+def drain_outbox(batch_size=None):
+    """Send one batch of due messages; returns the number of messages claimed.
+
+    Must run inside an application context.
+    """
+    from email_service import mail
+
+    batch_size = batch_size or current_app.config["MAIL_OUTBOX_BATCH_SIZE"]
+    entries = _claim_batch(batch_size)
+    if not entries:
+        return 0
+
+    try:
+        # One SMTP connection for the whole batch
+        with mail.connect() as connection:
+            for entry in entries:
+                try:
+                    with timed("smtp.send", "smtp"):
+                        connection.send(_to_message(entry))
+                    entry.status = "sent"
+                    entry.sent_at = datetime.utcnow()
+                    entry.locked_at = None
+                    entry.last_error = None
+                except Exception as e:
+                    _record_failure(entry, e)
+    except Exception as e:
+        # Connecting failed: every message in the batch gets retried later
+        current_app.logger.error(f"Error connecting to mail server: {e}")
+        for entry in entries:
+            if entry.status == "sending":
+                _record_failure(entry, e)
+
+    db.session.commit()
+    return len(entries)
+
+
+def flush_outbox():
+    """Send batches until no message is due; returns the number claimed.
+
+    Failed messages are rescheduled by their backoff, so this always ends.
+    """
+    total = 0
+    while True:
+        claimed = drain_outbox()
+        if not claimed:
+            return total
+        total += claimed
+
+
+def sends_queued_mail(command):
+    """Decorate a CLI command to send the mail it queued before it exits"""
+
+    @functools.wraps(command)
+    def wrapper(*args, **kwargs):
+        result = command(*args, **kwargs)
+        flush_outbox()
+        return result
+
+    return wrapper
+
+
+class OutboxSenderPool:
+    """Background threads that keep draining the outbox"""
+
+    def __init__(self, app, workers=None, poll_interval=None):
+        self.app = app
+        self.workers = workers or app.config["MAIL_OUTBOX_WORKERS"]
+        self.poll_interval = poll_interval or app.config["MAIL_OUTBOX_POLL_INTERVAL"]
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        self._pid = os.getpid()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                args=(self._stop,),
+                name=f"outbox-sender-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def ensure_started(self):
+        """Start the threads unless this process already runs them"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads don't survive a fork, only the parent's bookkeeping
+                self._stop = threading.Event()
+                self._threads = []
+                self.start()
+
+    def _run(self, stop):
+        while not stop.is_set():
+            sent = 0
+            with self.app.app_context():
+                try:
+                    sent = drain_outbox()
+                except Exception as e:
+                    self.app.logger.error(f"Error draining email outbox: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            if not sent:
+                stop.wait(self.poll_interval)
+
+
+def init_outbox(app):
+    """Set up the sender pool, started lazily by the first request"""
+    if app.config["MAIL_OUTBOX_WORKERS"] <= 0:
+        return None
+    pool = OutboxSenderPool(app)
+    app.before_request(pool.ensure_started)
+    app.extensions["email_outbox"] = pool
+    return pool
@@ -1,5 +1,8 @@
+from datetime import datetime
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import (
+    BooleanField,
     DateField,
     SelectField,
     TextAreaField,
@@ -7,8 +10,8 @@ from wtforms import (
     EmailField,
     SubmitField,
 )
-from wtforms.validators import DataRequired, Email, Length
-from models import Venue
+from wtforms.validators import DataRequired, Email, Length, ValidationError
+from venue_cache import get_venues
 
 
 class BookingForm(FlaskForm):
@@ -82,7 +85,36 @@ class BookingForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(BookingForm, self).__init__(*args, **kwargs)
-        self.venue_id.choices = [(v.id, v.name) for v in Venue.query.all()]
+        self.venue_id.choices = [(v.id, v.name) for v in get_venues()]
+
+
+class SeriesBookingForm(BookingForm):
+    interval_weeks = SelectField(
+        "Repeats",
+        choices=[(1, "Every week"), (2, "Every two weeks")],
+        coerce=int,
+        default=1,
+    )
+    until_date = DateField("Repeat Until", validators=[DataRequired()])
+    excluded_dates = StringField(
+        "Skip Dates",
+        render_kw={"placeholder": "e.g. 2025-04-18, 2025-05-01"},
+    )
+
+    def validate_end_time(self, field):
+        if self.start_time.data and field.data <= self.start_time.data:
+            raise ValidationError("Must be after the start time.")
+
+    def validate_until_date(self, field):
+        if self.event_date.data and field.data < self.event_date.data:
+            raise ValidationError("Must not be before the first date.")
+
+    def validate_excluded_dates(self, field):
+        for part in (field.data or "").replace(",", " ").split():
+            try:
+                datetime.strptime(part, "%Y-%m-%d")
+            except ValueError:
+                raise ValidationError(f"{part} is not a YYYY-MM-DD date.")
 
 
 class AdminResponseForm(FlaskForm):
@@ -93,3 +125,16 @@ class AdminResponseForm(FlaskForm):
     )
     approve = SubmitField("Approve Booking", render_kw={"class": "btn btn-success"})
     reject = SubmitField("Reject Booking", render_kw={"class": "btn btn-danger"})
+
+
+class BulkImportForm(FlaskForm):
+    bookings_file = FileField(
+        "Bookings File (CSV or JSONL)",
+        validators=[FileRequired(), FileAllowed(["csv", "jsonl", "json"])],
+    )
+    dry_run = BooleanField("Only check for conflicts, don't import")
+    submit = SubmitField("Import Bookings")
+
+
+class RecomputeStatsForm(FlaskForm):
+    submit = SubmitField("Recount")
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Subscribable iCalendar feeds of approved bookings.
+
+Every venue and every customer email has one feed, stored pre-rendered in
+the calendar_feed table. A review only re-renders the VEVENT blocks of the
+bookings it touched and splices them into the stored bytes, in the same
+transaction as the status change. Polling clients are answered from an
+(etag, updated_at) lookup and a per-process copy of the bytes, so a 304 or
+a repeat download never renders or reads a booking.
+"""
+
+import hashlib
+import hmac
+import itertools
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ArchivedBooking, BookingRequest, CalendarFeed
+from venue_cache import get_venue
+
+PRODID = "-//TUM Book a Venue//Venue Bookings//EN"
+UID_DOMAIN = "tum-book-a-venue"
+# Feeds whose bytes each process keeps in memory
+FEED_CACHE_SIZE = 256
+
+_EVENT_RE = re.compile(r"BEGIN:VEVENT\r\n.*?END:VEVENT\r\n", re.S)
+_UID_RE = re.compile(r"^UID:(.*)\r$", re.M)
+
+
+class FeedCache:
+    """Most recently served feed bodies, keyed by feed and checked by etag"""
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._feeds = OrderedDict()
+
+    def get(self, key, etag):
+        with self._lock:
+            entry = self._feeds.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._feeds.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, etag, body):
+        with self._lock:
+            self._feeds[key] = (etag, body)
+            self._feeds.move_to_end(key)
+            while len(self._feeds) > self.size:
+                self._feeds.popitem(last=False)
+
+
+def init_calendar_feeds(app):
+    cache = FeedCache(FEED_CACHE_SIZE)
+    app.extensions["calendar_feeds"] = cache
+    return cache
+
+
+def venue_feed_key(venue_id):
+    return f"venue:{venue_id}"
+
+
+def user_feed_token(email):
+    """Unguessable feed token for a customer email"""
+    key = (current_app.config.get("SECRET_KEY") or "").encode()
+    message = email.strip().lower().encode()
+    return hmac.new(key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def user_feed_key(token):
+    return f"user:{token}"
+
+
+def _escape(text):
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Fold a content line to 75 octets as RFC 5545 requires"""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        # Don't split a multi-byte character
+        while cut < len(data) and data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+        limit = 74  # Continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _local_time(event_date, hhmm):
+    return f"{event_date:%Y%m%d}T{hhmm.replace(':', '')}00"
+
+
+def render_event(booking):
+    """Render one approved booking as a VEVENT block"""
+    venue = get_venue(booking.venue_id)
+    stamp = booking.processed_at or booking.created_at or datetime.utcnow()
+    description = f"Reference: {booking.reference_number}"
+    if booking.event_description:
+        description = f"{booking.event_description}\n{description}"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{booking.booking_id}@{UID_DOMAIN}",
+        f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}",
+        # Floating times: the venue's local wall-clock time
+        f"DTSTART:{_local_time(booking.event_date, booking.start_time)}",
+        f"DTEND:{_local_time(booking.event_date, booking.end_time)}",
+        f"SUMMARY:{_escape(booking.event_title)}",
+        f"LOCATION:{_escape(venue.name if venue else '')}",
+        f"DESCRIPTION:{_escape(description)}",
+        "STATUS:CONFIRMED",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def _event_uid(block):
+    return _UID_RE.search(block).group(1)
+
+
+def _header(name):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def _render_calendar(header, blocks):
+    return (header + "".join(blocks) + "END:VCALENDAR\r\n").encode("utf-8")
+
+
+def empty_feed(name):
+    return _render_calendar(_header(name), [])
+
+
+def _write(key, body, old_etag=None):
+    """Store a feed body; with old_etag, only if nobody changed it meanwhile"""
+    etag = hashlib.sha1(body).hexdigest()
+    values = {"body": body, "etag": etag, "updated_at": datetime.utcnow()}
+    if old_etag is None:
+        # Two first approvals for one feed can both find no row; the loser
+        # of the INSERT overwrites the winner's body instead
+        try:
+            with db.session.begin_nested():
+                db.session.add(CalendarFeed(key=key, **values))
+        except IntegrityError:
+            db.session.execute(
+                db.update(CalendarFeed).where(CalendarFeed.key == key).values(**values),
+                execution_options={"synchronize_session": False},
+            )
+        return True
+    result = db.session.execute(
+        db.update(CalendarFeed)
+        .where(CalendarFeed.key == key, CalendarFeed.etag == old_etag)
+        .values(**values),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount == 1
+
+
+def _feed_name(key):
+    if key.startswith("venue:"):
+        venue = get_venue(int(key.split(":", 1)[1]))
+        return f"{venue.name} bookings" if venue else "Venue bookings"
+    return "My venue bookings"
+
+
+def _approved(model):
+    """Approved bookings of the live or archive table, in event order"""
+    # Archived rows only keep the HH:MM strings, which sort the same way
+    start = getattr(model, "start_minutes", model.start_time)
+    return model.query.filter(model.status == "approved").order_by(
+        model.event_date, start
+    )
+
+
+def _approved_bookings(key, email=None):
+    # Archived bookings first: they are the feed's past events
+    for model in (ArchivedBooking, BookingRequest):
+        query = _approved(model)
+        if key.startswith("venue:"):
+            query = query.filter(model.venue_id == int(key.split(":", 1)[1]))
+        else:
+            query = query.filter(
+                db.func.lower(model.user_email) == email.strip().lower()
+            )
+        yield from query
+
+
+def build_feed(key, email=None):
+    """Render a whole feed from live and archived approvals (the caller commits)"""
+    blocks = [render_event(booking) for booking in _approved_bookings(key, email)]
+    _write(key, _render_calendar(_header(_feed_name(key)), blocks))
+
+
+def update_calendar_feeds(bookings):
+    """Splice reviewed bookings into their venue and user feeds.
+
+    Approved bookings are added or replaced, anything else is removed.
+    Call before committing the review; the feeds change in the same
+    transaction.
+    """
+    changes = {}  # key -> (email, {uid: block or None})
+    for booking in bookings:
+        uid = f"{booking.booking_id}@{UID_DOMAIN}"
+        block = render_event(booking) if booking.status == "approved" else None
+        for key in (
+            venue_feed_key(booking.venue_id),
+            user_feed_key(user_feed_token(booking.user_email)),
+        ):
+            changes.setdefault(key, (booking.user_email, {}))[1][uid] = block
+
+    for key, (email, events) in changes.items():
+        feed = db.session.get(CalendarFeed, key)
+        if feed is None:
+            # First approval for this feed: render it once from the table
+            if any(events.values()):
+                build_feed(key, email)
+            continue
+
+        text = feed.body.decode("utf-8")
+        match = _EVENT_RE.search(text)
+        header = text[: match.start()] if match else text[: text.rindex("END:")]
+        blocks = OrderedDict(
+            (_event_uid(block), block) for block in _EVENT_RE.findall(text)
+        )
+        for uid, block in events.items():
+            if block is None:
+                blocks.pop(uid, None)
+            else:
+                blocks[uid] = block
+        body = _render_calendar(header, blocks.values())
+        if body != feed.body and not _write(key, body, feed.etag):
+            # A concurrent review got there first; start from the table
+            build_feed(key, email)
+
+
+def rebuild_calendar_feeds():
+    """Re-render every venue and user feed from the approved bookings.
+
+    Archived bookings are included, so past events stay in the feeds after
+    archive-bookings has moved them out of booking_request.
+    """
+    feeds = {}
+    for booking in itertools.chain(
+        _approved(ArchivedBooking), _approved(BookingRequest)
+    ):
+        block = render_event(booking)
+        for key in (
+            venue_feed_key(booking.venue_id),
+            user_feed_key(user_feed_token(booking.user_email)),
+        ):
+            feeds.setdefault(key, []).append(block)
+
+    CalendarFeed.query.delete()
+    for key, blocks in feeds.items():
+        _write(key, _render_calendar(_header(_feed_name(key)), blocks))
+    db.session.commit()
+
+
+def feed_version(key):
+    """(etag, updated_at) of a stored feed, or None"""
+    return (
+        db.session.query(CalendarFeed.etag, CalendarFeed.updated_at)
+        .filter_by(key=key)
+        .first()
+    )
+
+
+def feed_body(key, etag):
+    """The feed's bytes, from this process's cache when the etag still matches"""
+    cache = current_app.extensions["calendar_feeds"]
+    body = cache.get(key, etag)
+    if body is None:
+        body = db.session.query(CalendarFeed.body).filter_by(key=key).scalar()
+        cache.put(key, etag, body)
+    return body
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Opt-in request instrumentation.
+
+With METRICS_ENABLED set, every request records its SQL query count and
+time, template render time and the time spent in email and Calendar
+calls. The totals go out in a Server-Timing header and into per-process
+Prometheus histograms served at /admin/metrics. Each gunicorn worker
+keeps its own registry, so scrape the workers rather than the balancer.
+
+When disabled no hooks are registered; the ``timed`` wrappers around the
+email and Calendar calls only check for the missing extension.
+"""
+
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+
+from models import db
+
+# Seconds; roughly the range between a cached JSON hit and an SMTP timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Server-Timing entries, in the order they appear in the header
+TIMING_NAMES = ("db", "tpl", "email", "smtp", "calendar")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, values, seconds):
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                series[i] += 1
+        series[-2] += seconds
+        series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, series in sorted(self._series.items()):
+            labels = _labels(self.labels, values)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+
+    def inc(self, values, amount=1):
+        self._values[values] = self._values.get(values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, values)}}} {total}")
+        return lines
+
+
+class Metrics:
+    """Per-process registry of the request and dependency metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter(
+            "http_requests_total", "Requests handled", ("route", "method", "status")
+        )
+        self.latency = Histogram(
+            "http_request_duration_seconds",
+            "Time until the view returned its response",
+            ("route", "method"),
+        )
+        self.queries = Counter(
+            "db_queries_total", "SQL statements executed per route", ("route",)
+        )
+        self.query_time = Histogram(
+            "db_request_duration_seconds",
+            "SQL time spent by one request",
+            ("route",),
+        )
+        self.templates = Histogram(
+            "template_render_duration_seconds",
+            "Jinja render time per top-level template",
+            ("template",),
+        )
+        self.calls = Histogram(
+            "dependency_call_duration_seconds",
+            "Time in email rendering, SMTP and Google Calendar calls",
+            ("operation",),
+        )
+
+    def record_request(self, route, method, status, seconds, timings):
+        queries, query_seconds = timings.get("db", (0, 0.0))
+        with self._lock:
+            self.requests.inc((route, method, str(status)))
+            self.latency.observe((route, method), seconds)
+            self.queries.inc((route,), queries)
+            self.query_time.observe((route,), query_seconds)
+
+    def record_template(self, name, seconds):
+        with self._lock:
+            self.templates.observe((name,), seconds)
+
+    def record_call(self, operation, seconds):
+        with self._lock:
+            self.calls.observe((operation,), seconds)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (
+                self.requests,
+                self.latency,
+                self.queries,
+                self.query_time,
+                self.templates,
+                self.calls,
+            ):
+                lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+def _add_timing(name, seconds):
+    """Add to the current request's Server-Timing totals"""
+    timings = g.setdefault("timings", {})
+    count, total = timings.get(name, (0, 0.0))
+    timings[name] = (count + 1, total + seconds)
+
+
+def get_metrics():
+    """The registry, or None when instrumentation is disabled"""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("metrics")
+
+
+class timed:
+    """Time a block or function as ``operation`` (a no-op when disabled).
+
+    ``timing`` names the Server-Timing entry it adds to, e.g. "email".
+    """
+
+    def __init__(self, operation, timing):
+        self.operation = operation
+        self.timing = timing
+
+    def __enter__(self):
+        self._metrics = get_metrics()
+        if self._metrics is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self._metrics is not None:
+            seconds = time.perf_counter() - self._started
+            self._metrics.record_call(self.operation, seconds)
+            if has_request_context():
+                _add_timing(self.timing, seconds)
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # A fresh timer per call, so concurrent calls don't share state
+            with timed(self.operation, self.timing):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else "<unmatched>"
+
+
+def _server_timing(timings, total):
+    entries = []
+    for name in TIMING_NAMES:
+        if name in timings:
+            count, seconds = timings[name]
+            entries.append(f'{name};dur={seconds * 1000:.1f};desc="{count}x"')
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def init_metrics(app):
+    """Register the instrumentation hooks if METRICS_ENABLED is set"""
+    if not app.config["METRICS_ENABLED"]:
+        return None
+    metrics = Metrics()
+    app.extensions["metrics"] = metrics
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.get("request_started")
+        if started is None:
+            return response
+        seconds = time.perf_counter() - started
+        timings = g.get("timings", {})
+        metrics.record_request(
+            _route(), request.method, response.status_code, seconds, timings
+        )
+        response.headers["Server-Timing"] = _server_timing(timings, seconds)
+        return response
+
+    def _before_render(sender, template, context, **extra):
+        g.setdefault("render_started", []).append(time.perf_counter())
+
+    def _rendered(sender, template, context, **extra):
+        stack = g.get("render_started")
+        if not stack:
+            return
+        seconds = time.perf_counter() - stack.pop()
+        metrics.record_template(template.name, seconds)
+        if has_request_context():
+            _add_timing("tpl", seconds)
+
+    before_render_template.connect(_before_render, app, weak=False)
+    template_rendered.connect(_rendered, app, weak=False)
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        # Background senders have no request to attribute queries to
+        if has_request_context():
+            _add_timing("db", seconds)
+
+    def _failed_execute(context):
+        if context.connection is not None:
+            stack = context.connection.info.get("query_started")
+            if stack:
+                stack.pop()
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        db.event.listen(engine, "before_cursor_execute", _before_execute)
+        db.event.listen(engine, "after_cursor_execute", _after_execute)
+        db.event.listen(engine, "handle_error", _failed_execute)
+
+    return metrics
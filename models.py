@@ -1,16 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import random
-import string
+from db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
-def generate_reference_number():
-    """Generate user-friendly reference number"""
-    prefix = "VB"
-    suffix = "".join(random.choices(string.digits, k=6))
-    return f"{prefix}{suffix}"
+def time_to_minutes(value):
+    """Convert an HH:MM string to minutes since midnight"""
+    hour, minute = map(int, value.split(":"))
+    return hour * 60 + minute
 
 
 class Venue(db.Model):
@@ -37,6 +35,8 @@ class BookingRequest(db.Model):
     event_date = db.Column(db.Date, nullable=False)
     start_time = db.Column(db.String(10), nullable=False)
     end_time = db.Column(db.String(10), nullable=False)
+    start_minutes = db.Column(db.Integer)  # Minutes since midnight, kept in sync
+    end_minutes = db.Column(db.Integer)  # with start_time/end_time for SQL overlap
     event_title = db.Column(db.String(200), nullable=False)
     event_description = db.Column(db.Text)
     status = db.Column(db.String(20), default="pending")  # pending, approved, rejected
@@ -44,8 +44,203 @@ class BookingRequest(db.Model):
     processed_at = db.Column(db.DateTime)  # When admin responded
     admin_response = db.Column(db.Text)
     is_processed = db.Column(db.Boolean, default=False)  # Prevent duplicate responses
+    series_id = db.Column(db.Integer, db.ForeignKey("booking_series.id"))
 
     venue = db.relationship("Venue", backref=db.backref("bookings", lazy=True))
 
+    __table_args__ = (
+        # Range scan for the EXISTS overlap check on a venue's day (has_conflict)
+        db.Index(
+            "ix_booking_request_venue_date_status_start",
+            "venue_id",
+            "event_date",
+            "status",
+            "start_minutes",
+        ),
+        # Venues booked on a given day (view_venues), covering venue_id
+        db.Index(
+            "ix_booking_request_date_status_venue",
+            "event_date",
+            "status",
+            "venue_id",
+        ),
+        # Oldest-first keyset pages of the review queue (admin_queue), and
+        # any lookup by status alone
+        db.Index(
+            "ix_booking_request_status_created_at_id", "status", "created_at", "id"
+        ),
+        # Newest-first listings and keyset pages (admin_dashboard,
+        # admin_bookings, export_bookings)
+        db.Index("ix_booking_request_created_at_id", "created_at", "id"),
+        # admin_bookings pages filtered by venue, or by venue and status
+        db.Index(
+            "ix_booking_request_venue_created_at_id", "venue_id", "created_at", "id"
+        ),
+        db.Index(
+            "ix_booking_request_venue_status_created_at_id",
+            "venue_id",
+            "status",
+            "created_at",
+            "id",
+        ),
+        # admin_bookings pages filtered by event date, in (event_date, id)
+        # order, alone or with a status or venue filter
+        db.Index("ix_booking_request_event_date_id", "event_date", "id"),
+        db.Index(
+            "ix_booking_request_status_event_date_id", "status", "event_date", "id"
+        ),
+        db.Index(
+            "ix_booking_request_venue_event_date_id", "venue_id", "event_date", "id"
+        ),
+        # Occurrences of a recurring series
+        db.Index("ix_booking_request_series_id", "series_id"),
+    )
+
+    @db.validates("start_time")
+    def _sync_start_minutes(self, key, value):
+        self.start_minutes = time_to_minutes(value)
+        return value
+
+    @db.validates("end_time")
+    def _sync_end_minutes(self, key, value):
+        self.end_minutes = time_to_minutes(value)
+        return value
+
     def __repr__(self):
         return f"<BookingRequest {self.reference_number}>"
+
+
+class ArchivedBooking(db.Model):
+    """A processed booking moved out of booking_request (see archive.py)"""
+
+    __tablename__ = "booking_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # Original id
+    booking_id = db.Column(db.String(36), unique=True, nullable=False)
+    reference_number = db.Column(db.String(20), unique=True, nullable=False)
+    user_name = db.Column(db.String(100), nullable=False)
+    user_email = db.Column(db.String(120), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey("venue.id"), nullable=False)
+    event_date = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.String(10), nullable=False)
+    end_time = db.Column(db.String(10), nullable=False)
+    event_title = db.Column(db.String(200), nullable=False)
+    event_description = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+    admin_response = db.Column(db.Text)
+    series_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Newest-first archive part of export_bookings
+        db.Index("ix_booking_archive_created_at", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<ArchivedBooking {self.reference_number}>"
+
+
+class BookingSeries(db.Model):
+    """A weekly or bi-weekly booking, reviewed as a whole"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    series_id = db.Column(db.String(36), unique=True, nullable=False)  # Internal UUID
+    reference_number = db.Column(db.String(20), unique=True, nullable=False)
+    user_name = db.Column(db.String(100), nullable=False)
+    user_email = db.Column(db.String(120), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey("venue.id"), nullable=False)
+    start_time = db.Column(db.String(10), nullable=False)
+    end_time = db.Column(db.String(10), nullable=False)
+    event_title = db.Column(db.String(200), nullable=False)
+    event_description = db.Column(db.Text)
+    first_date = db.Column(db.Date, nullable=False)
+    until_date = db.Column(db.Date, nullable=False)
+    interval_weeks = db.Column(db.Integer, nullable=False, default=1)  # 1 or 2
+    excluded_dates = db.Column(db.Text)  # Comma separated YYYY-MM-DD
+    status = db.Column(db.String(20), default="pending")  # pending, approved, rejected
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    admin_response = db.Column(db.Text)
+    is_processed = db.Column(db.Boolean, default=False)
+
+    venue = db.relationship("Venue")
+    bookings = db.relationship(
+        "BookingRequest",
+        backref="series",
+        lazy=True,
+        order_by="BookingRequest.event_date",
+    )
+
+    def __repr__(self):
+        return f"<BookingSeries {self.reference_number}>"
+
+
+class VenueAvailability(db.Model):
+    """Bitmap of approved 30-minute slots for one venue on one day"""
+
+    venue_id = db.Column(db.Integer, db.ForeignKey("venue.id"), primary_key=True)
+    event_date = db.Column(db.Date, primary_key=True)
+    slot_mask = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<VenueAvailability {self.venue_id} {self.event_date}>"
+
+
+class VenueBookingStats(db.Model):
+    """Running booking counts per venue and status for the admin dashboard"""
+
+    venue_id = db.Column(db.Integer, db.ForeignKey("venue.id"), primary_key=True)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    approved = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<VenueBookingStats {self.venue_id}>"
+
+
+class ReferenceSequence(db.Model):
+    """Single-row counter that reference number blocks are reserved from"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    next_value = db.Column(db.Integer, nullable=False, default=0)
+    key_fingerprint = db.Column(db.String(16))  # Of the key the blocks were used with
+
+
+class CalendarFeed(db.Model):
+    """Pre-rendered iCalendar feed of approved bookings, per venue or user"""
+
+    key = db.Column(db.String(80), primary_key=True)  # venue:<id> or user:<token>
+    body = db.Column(db.LargeBinary, nullable=False)
+    etag = db.Column(db.String(40), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<CalendarFeed {self.key}>"
+
+
+class EmailOutbox(db.Model):
+    """Outgoing email, written in the same transaction as the change it reports"""
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(120))
+    recipients = db.Column(db.Text, nullable=False)  # JSON list of addresses
+    body = db.Column(db.Text)
+    html = db.Column(db.Text)
+    # pending, sending, sent, failed
+    status = db.Column(db.String(20), default="pending")
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)  # When a sender claimed the message
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.id} {self.status}>"
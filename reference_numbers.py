@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Collision-free booking reference numbers.
+
+Each process reserves a block of sequence numbers with one atomic UPDATE on
+the reference_sequence row and hands them out from memory. A sequence
+number is turned into a reference with a keyed Feistel permutation, so the
+references look random but two sequence numbers can never map to the same
+one. No lookup query is needed per booking.
+
+References have 7 digits (VB0000000 - VB9999999). Older random references
+have 6, so the two schemes can't collide either. REFERENCE_KEY must never
+change once bookings exist, or new references could repeat old ones, so a
+fingerprint of the key is stored with the counter: with any other key,
+reserving a block fails (and init_database refuses to start) instead of
+handing out references that may collide.
+"""
+
+import hashlib
+import hmac
+import threading
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ReferenceSequence
+
+PREFIX = "VB"
+DIGITS = 7
+DOMAIN = 10**DIGITS
+# The Feistel network permutes 10**8 values (two 4-digit halves); cycle
+# walking restricts it to the 10**7 values of the reference space
+HALF = 10**4
+ROUNDS = 4
+
+
+def _round(key, round_index, value):
+    digest = hmac.new(key, f"{round_index}:{value}".encode(), hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], "big") % HALF
+
+
+def permute(key, number):
+    """Map a number in [0, DOMAIN) to a unique number in [0, DOMAIN)"""
+    if not 0 <= number < DOMAIN:
+        raise ValueError("Reference number space exhausted")
+    value = number
+    while True:
+        left, right = divmod(value, HALF)
+        for round_index in range(ROUNDS):
+            left, right = right, (left + _round(key, round_index, right)) % HALF
+        value = left * HALF + right
+        if value < DOMAIN:
+            return value
+
+
+KEY_CHANGED = (
+    "REFERENCE_KEY differs from the key the existing booking references were "
+    "made with (it defaults to SECRET_KEY); set it back to that key"
+)
+
+
+def reference_key(config):
+    """The permutation key; SECRET_KEY stands in while REFERENCE_KEY is unset"""
+    return (config["REFERENCE_KEY"] or config["SECRET_KEY"]).encode()
+
+
+def key_fingerprint(key):
+    """Identifies the key in the database without revealing it"""
+    return hmac.new(key, b"reference-key", hashlib.sha256).hexdigest()[:16]
+
+
+def check_reference_key():
+    """Raise RuntimeError if the counter was started with a different key"""
+    stored = (
+        db.session.query(ReferenceSequence.key_fingerprint)
+        .filter(ReferenceSequence.id == 1)
+        .scalar()
+    )
+    if stored is not None and stored != key_fingerprint(
+        reference_key(current_app.config)
+    ):
+        raise RuntimeError(KEY_CHANGED)
+
+
+class ReferenceAllocator:
+    """Hands out sequence numbers from blocks reserved in the database"""
+
+    def __init__(self, block_size, fingerprint):
+        self.block_size = block_size
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def _reserve_block(self):
+        # Own short transaction, so the reservation isn't tied to the booking's
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                db.update(ReferenceSequence)
+                .where(ReferenceSequence.id == 1)
+                .values(next_value=ReferenceSequence.next_value + self.block_size)
+            )
+            if result.rowcount == 0:
+                conn.execute(
+                    db.insert(ReferenceSequence).values(
+                        id=1,
+                        next_value=self.block_size,
+                        key_fingerprint=self.fingerprint,
+                    )
+                )
+            end, stored = conn.execute(
+                db.select(
+                    ReferenceSequence.next_value, ReferenceSequence.key_fingerprint
+                ).where(ReferenceSequence.id == 1)
+            ).one()
+            if stored is None:
+                # Counter from before fingerprints were kept: adopt this key
+                conn.execute(
+                    db.update(ReferenceSequence)
+                    .where(ReferenceSequence.id == 1)
+                    .values(key_fingerprint=self.fingerprint)
+                )
+            elif stored != self.fingerprint:
+                raise RuntimeError(KEY_CHANGED)  # Rolls the reservation back
+        self._next, self._end = end - self.block_size, end
+
+    def _reserve(self):
+        try:
+            self._reserve_block()
+        except IntegrityError:
+            # Another process created the counter row first; use it
+            self._reserve_block()
+
+    def next_number(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._reserve()
+            number = self._next
+            self._next += 1
+            return number
+
+
+def init_reference_numbers(app):
+    if not app.config["REFERENCE_KEY"]:
+        app.logger.warning(
+            "REFERENCE_KEY is not set: booking references are keyed with "
+            "SECRET_KEY, which then can't be rotated"
+        )
+    allocator = ReferenceAllocator(
+        app.config["REFERENCE_BLOCK_SIZE"], key_fingerprint(reference_key(app.config))
+    )
+    app.extensions["reference_allocator"] = allocator
+    return allocator
+
+
+def generate_reference_number():
+    """Generate user-friendly reference number"""
+    key = reference_key(current_app.config)
+    number = current_app.extensions["reference_allocator"].next_number()
+    return f"{PREFIX}{permute(key, number):0{DIGITS}d}"
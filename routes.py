@@ -11,16 +11,77 @@ from flask import (
     flash,
     session,
     jsonify,
+    Response,
+    stream_with_context,
+    current_app,
     make_response,
+    abort,
 )
 from datetime import datetime, date as date_type, time
 import uuid
+import hashlib
 import csv, json
 import io
-from models import db, Venue, BookingRequest, generate_reference_number
-from forms import BookingForm, AdminResponseForm
+import zlib
+import itertools
+import queue
+from models import db, Venue, BookingRequest, BookingSeries, ArchivedBooking
+from forms import (
+    BookingForm,
+    SeriesBookingForm,
+    AdminResponseForm,
+    BulkImportForm,
+    RecomputeStatsForm,
+)
+from bulk_import import parse_rows, import_bookings
+from bulk_review import (
+    pending_queue,
+    encode_cursor,
+    decode_cursor,
+    review_bookings,
+)
+from booking_series import (
+    SERIES_MAX_OCCURRENCES,
+    parse_excluded_dates,
+    format_excluded_dates,
+    series_dates,
+    find_conflicts,
+    create_series,
+    review_series,
+)
 from email_service import send_admin_notification, send_user_notification
-from calendar_service import CalendarService
+from reference_numbers import generate_reference_number
+from metrics import get_metrics
+from archive import find_booking
+from db_routing import read_only
+from venue_cache import get_venue, get_venues, venue_catalog_version
+from status_events import get_broker, status_payload, publish_status
+from ics_feeds import (
+    venue_feed_key,
+    user_feed_key,
+    user_feed_token,
+    feed_version,
+    feed_body,
+    empty_feed,
+    update_calendar_feeds,
+)
+from booking_stats import (
+    record_booking_created,
+    record_status_change,
+    get_dashboard_stats,
+    recompute_booking_stats,
+)
+from availability import (
+    SLOT_LENGTH_MINUTES,
+    SLOT_START_TIME,
+    get_booked_mask,
+    get_booked_masks,
+    free_hours,
+    slot_mask,
+    booked_slots,
+    has_conflict,
+    reserve_slots,
+)
 
 main = Blueprint("main", __name__)
 
@@ -84,54 +145,34 @@ def book_venue():
     if request.method == "POST":
         form = BookingForm(request.form)
         if form.validate():
-            # Convert form times to time objects for comparison
-            new_start_time = datetime.strptime(form.start_time.data, "%H:%M").time()
-            new_end_time = datetime.strptime(form.end_time.data, "%H:%M").time()
-
-            # Find all approved bookings for the same venue and date
-            conflicting_bookings = BookingRequest.query.filter(
-                BookingRequest.venue_id == form.venue_id.data,
-                BookingRequest.event_date == form.event_date.data,
-                BookingRequest.status == "approved",
-            ).all()
-
-            # Check for time overlap
-            for approved_booking in conflicting_bookings:
-                existing_start = datetime.strptime(
-                    approved_booking.start_time, "%H:%M"
-                ).time()
-                existing_end = datetime.strptime(
-                    approved_booking.end_time, "%H:%M"
-                ).time()
-
-                # Overlap condition: (StartA < EndB) and (StartB < EndA)
-                if new_start_time < existing_end and existing_start < new_end_time:
-                    flash(
-                        f"The selected time slot ({form.start_time.data} - {form.end_time.data}) conflicts with an existing booking. Please choose a different time.",
-                        "danger",
-                    )
-
-                    # We need to re-render the page with an error, so we need the preselected_venue
-                    preselected_venue = Venue.query.get(form.venue_id.data)
-                    # We also need to pass the booked slots again for the frontend to display
-                    booked_slots = []
-                    for b in conflicting_bookings:
-                        booked_slots.append({"start": b.start_time, "end": b.end_time})
-
-                    return render_template(
-                        "book.html",
-                        form=form,
-                        preselected_venue=preselected_venue,
-                        booked_slots_json=json.dumps(booked_slots),
-                    )
+            # Check the requested slot against the venue's availability bitmap
+            booked_mask = get_booked_mask(form.venue_id.data, form.event_date.data)
+            if booked_mask & slot_mask(
+                form.start_time.data, form.end_time.data
+            ) or has_conflict(
+                form.venue_id.data,
+                form.event_date.data,
+                form.start_time.data,
+                form.end_time.data,
+            ):
+                flash(
+                    f"The selected time slot ({form.start_time.data} - {form.end_time.data}) conflicts with an existing booking. Please choose a different time.",
+                    "danger",
+                )
+
+                # We need to re-render the page with an error, so we need the preselected_venue
+                preselected_venue = get_venue(form.venue_id.data)
+                # We also need to pass the booked slots again for the frontend to display
+                return render_template(
+                    "book.html",
+                    form=form,
+                    preselected_venue=preselected_venue,
+                    booked_slots_json=json.dumps(booked_slots(booked_mask)),
+                )
 
             # If no conflicts, proceed to create the booking
             booking_id = str(uuid.uuid4())
             reference_number = generate_reference_number()
-            while BookingRequest.query.filter_by(
-                reference_number=reference_number
-            ).first():
-                reference_number = generate_reference_number()
 
             booking = BookingRequest(
                 booking_id=booking_id,
@@ -147,8 +188,12 @@ def book_venue():
             )
 
             db.session.add(booking)
-            db.session.commit()
+            # Flush so the notification can see the venue, then queue it in
+            # the same transaction as the booking
+            db.session.flush()
+            record_booking_created(booking)
             send_admin_notification(booking)
+            db.session.commit()
             flash(
                 f"Your booking request has been submitted! Your reference number is {reference_number}.",
                 "success",
@@ -172,70 +217,374 @@ def book_venue():
 
     # This runs for GET requests and failed POSTs
     preselected_venue = None
-    booked_slots = []
+    slots = []
     if form.venue_id.data:
-        preselected_venue = Venue.query.get(form.venue_id.data)
+        preselected_venue = get_venue(form.venue_id.data)
         if preselected_venue and form.event_date.data:
-            bookings = BookingRequest.query.filter_by(
-                venue_id=form.venue_id.data,
-                event_date=form.event_date.data,
-                status="approved",
-            ).all()
-            for b in bookings:
-                booked_slots.append({"start": b.start_time, "end": b.end_time})
+            slots = booked_slots(
+                get_booked_mask(form.venue_id.data, form.event_date.data)
+            )
 
     return render_template(
         "book.html",
         form=form,
         preselected_venue=preselected_venue,
-        booked_slots_json=json.dumps(booked_slots),
+        booked_slots_json=json.dumps(slots),
+    )
+
+
+@main.route("/book/series", methods=["GET", "POST"])
+def book_series():
+    """Request a weekly or bi-weekly booking as one series"""
+    form = SeriesBookingForm()
+    if request.method == "GET":
+        form.venue_id.data = request.args.get("venue", type=int)
+
+    if form.validate_on_submit():
+        excluded = parse_excluded_dates(form.excluded_dates.data)
+        dates = series_dates(
+            form.event_date.data,
+            form.until_date.data,
+            form.interval_weeks.data,
+            excluded,
+        )
+        # Every occurrence is checked against the bitmaps in one query
+        conflicts = []
+        if 0 < len(dates) <= SERIES_MAX_OCCURRENCES:
+            conflicts = find_conflicts(
+                form.venue_id.data, dates, form.start_time.data, form.end_time.data
+            )
+        if not dates:
+            flash("Every date of this series is skipped.", "danger")
+        elif len(dates) > SERIES_MAX_OCCURRENCES:
+            flash(
+                f"A series can have at most {SERIES_MAX_OCCURRENCES} dates; this one has {len(dates)}.",
+                "danger",
+            )
+        elif conflicts:
+            flash(
+                "These dates conflict with existing bookings: "
+                + ", ".join(d.isoformat() for d in conflicts)
+                + ". Add them to the skipped dates or choose a different time.",
+                "danger",
+            )
+        else:
+            series = create_series(
+                {
+                    "user_name": form.user_name.data,
+                    "user_email": form.user_email.data,
+                    "venue_id": form.venue_id.data,
+                    "start_time": form.start_time.data,
+                    "end_time": form.end_time.data,
+                    "event_title": form.event_title.data,
+                    "event_description": form.event_description.data,
+                    "interval_weeks": form.interval_weeks.data,
+                    "excluded_dates": format_excluded_dates(excluded) or None,
+                },
+                dates,
+            )
+            db.session.commit()
+            flash(
+                f"Your recurring booking request for {len(dates)} dates has been submitted! Your reference number is {series.reference_number}.",
+                "success",
+            )
+            return redirect(
+                url_for("main.series_status", reference=series.reference_number)
+            )
+
+    return render_template("book_series.html", form=form)
+
+
+def _make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def _not_modified(etag):
+    """Return a 304 response if the client already has this version"""
+    # Pending flash messages must still be rendered, so never short-circuit them
+    if session.get("_flashes"):
+        return None
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    return None
+
+
+def _with_etag(response, etag):
+    if not session.get("_flashes"):
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _booking_etag(reference, kind):
+    """Derive a validator from the booking's table, id, status and processed_at.
+
+    Only these three columns are read, so a repeat request costs one indexed
+    lookup instead of loading and rendering the booking. The table is part
+    of it because an archived booking's page renders without the calendar
+    link, and the venue catalog version because the page shows the venue's
+    name.
+    """
+    for model in (BookingRequest, ArchivedBooking):
+        row = (
+            db.session.query(model.id, model.status, model.processed_at)
+            .filter_by(reference_number=reference)
+            .first()
+        )
+        if row is not None:
+            break
+    else:
+        abort(404)
+    booking_id, status, processed_at = row
+    return _make_etag(
+        kind,
+        model.__tablename__,
+        booking_id,
+        status,
+        processed_at,
+        venue_catalog_version(),
     )
 
 
 @main.route("/venues")
+@read_only
 def view_venues():
     selected_date = request.args.get("date")
-    venues = Venue.query.order_by(Venue.name).all()
+    # Summarise a single day or the week starting at the selected date
+    span = "week" if request.args.get("span") == "week" else "day"
     today = date_type.today().isoformat()
     booked_venue_ids = set()  # Use a set for efficient lookups
 
+    date_obj = None
     if selected_date:
         try:
             date_obj = datetime.strptime(selected_date, "%Y-%m-%d").date()
-            # Find IDs of venues that are booked and approved on the selected date
-            booked_venue_ids = {
-                b.venue_id
-                for b in BookingRequest.query.filter_by(
-                    event_date=date_obj, status="approved"
-                ).all()
-            }
         except ValueError:
             flash("Invalid date format provided.", "danger")
-            # Fall through to show all venues
+            # Fall through to show all venues, without any availability badges
+            selected_date = None
+
+    venues = get_venues()
+    free_hours_by_venue = {}
+    masks = []
+    if date_obj:
+        free_hours_by_venue, masks = free_hours(
+            [venue.id for venue in venues], date_obj, 7 if span == "week" else 1
+        )
+    # The approved-slot bitmaps for the range double as its bookings version
+    etag = _make_etag(
+        "venues", today, selected_date, span, venue_catalog_version(), masks
+    )
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
 
-    return render_template(
-        "venues.html",
-        venues=venues,
-        selected_date=selected_date,
-        today=today,
-        booked_venue_ids=booked_venue_ids,  # Pass the set of booked IDs
+    # Venues with no free slot left in the selected range
+    booked_venue_ids = {
+        venue_id for venue_id, hours in free_hours_by_venue.items() if not hours
+    }
+
+    response = make_response(
+        render_template(
+            "venues.html",
+            venues=venues,
+            selected_date=selected_date,
+            span=span,
+            today=today,
+            booked_venue_ids=booked_venue_ids,  # Pass the set of booked IDs
+            free_hours=free_hours_by_venue,
+        )
     )
+    return _with_etag(response, etag)
 
 
 @main.route("/booking/<reference>")
+@read_only
 def booking_status(reference):
-    booking = BookingRequest.query.filter_by(reference_number=reference).first_or_404()
-    return render_template("booking_status.html", booking=booking)
+    etag = _booking_etag(reference, "page")
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    booking = find_booking(reference)
+    if booking is None:
+        abort(404)
+    response = make_response(
+        render_template(
+            "booking_status.html",
+            booking=booking,
+            venue=get_venue(booking.venue_id),
+            feed_token=user_feed_token(booking.user_email),
+            archived=isinstance(booking, ArchivedBooking),
+        )
+    )
+    return _with_etag(response, etag)
 
 
 @main.route("/api/booking-status/<reference>")
+@read_only
 def api_booking_status(reference):
     """API endpoint to get the latest booking status."""
-    booking = BookingRequest.query.filter_by(reference_number=reference).first_or_404()
+    etag = _booking_etag(reference, "api")
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    booking = find_booking(reference)
+    if booking is None:
+        abort(404)
+
+    return _with_etag(jsonify(status_payload(booking)), etag)
+
+
+@main.route("/series/<reference>")
+def series_status(reference):
+    series = BookingSeries.query.filter_by(reference_number=reference).first_or_404()
+    return render_template(
+        "series_status.html", series=series, venue=get_venue(series.venue_id)
+    )
+
+
+# Calendar apps poll feeds; let them and proxies reuse a copy for a while
+FEED_MAX_AGE = 300
+
+
+def _feed_response(key, version, cache_control):
+    """Serve a stored feed, answering revalidations without loading it"""
+    etag, updated_at = version
+    if request.if_none_match.contains(etag) or (
+        not request.if_none_match
+        and request.if_modified_since
+        and request.if_modified_since.replace(tzinfo=None)
+        >= updated_at.replace(microsecond=0)
+    ):
+        response = Response(status=304)
+    else:
+        response = Response(feed_body(key, etag), mimetype="text/calendar")
+    response.set_etag(etag)
+    response.last_modified = updated_at
+    response.headers["Cache-Control"] = f"{cache_control}, max-age={FEED_MAX_AGE}"
+    return response
+
+
+@main.route("/calendar/venue/<int:venue_id>.ics")
+def venue_calendar(venue_id):
+    """Subscribable feed of a venue's approved bookings"""
+    if get_venue(venue_id) is None:
+        abort(404)
+    key = venue_feed_key(venue_id)
+    version = feed_version(key)
+    if version is None:
+        # Feeds are written at startup and by reviews, never by a GET; no row
+        # means nothing approved at this venue yet
+        venue = get_venue(venue_id)
+        response = Response(
+            empty_feed(f"{venue.name} bookings"), mimetype="text/calendar"
+        )
+        response.headers["Cache-Control"] = f"public, max-age={FEED_MAX_AGE}"
+        return response
+    return _feed_response(key, version, "public")
+
+
+@main.route("/calendar/user/<token>.ics")
+def user_calendar(token):
+    """Subscribable feed of one customer's approved bookings"""
+    key = user_feed_key(token)
+    version = feed_version(key)
+    if version is None:
+        # Nothing approved for this customer yet
+        response = Response(empty_feed("My venue bookings"), mimetype="text/calendar")
+        response.headers["Cache-Control"] = f"private, max-age={FEED_MAX_AGE}"
+        return response
+    return _feed_response(key, version, "private")
+
+
+# Longest date range a single availability request may cover
+AVAILABILITY_MAX_DAYS = 92
+
+
+@main.route("/api/availability")
+@read_only
+def api_availability():
+    """Approved-slot bitmaps of one venue for a range of dates.
+
+    Bit i of a day's mask marks the 30-minute slot starting at
+    first_slot + i * slot_minutes; days without bookings are omitted.
+    """
+    venue_id = request.args.get("venue", type=int)
+    try:
+        date_from = datetime.strptime(request.args["from"], "%Y-%m-%d").date()
+        date_to = datetime.strptime(
+            request.args.get("to", request.args["from"]), "%Y-%m-%d"
+        ).date()
+    except (KeyError, ValueError):
+        return jsonify({"error": "from/to must be dates in YYYY-MM-DD format"}), 400
+    if not venue_id or get_venue(venue_id) is None:
+        return jsonify({"error": "Unknown venue"}), 400
+    if date_to < date_from or (date_to - date_from).days >= AVAILABILITY_MAX_DAYS:
+        return (
+            jsonify(
+                {"error": f"Date range must cover 1 to {AVAILABILITY_MAX_DAYS} days"}
+            ),
+            400,
+        )
 
-    return jsonify(
-        {"status": booking.status, "admin_response": booking.admin_response or ""}
+    masks = get_booked_masks(venue_id, date_from, date_to)
+    etag = _make_etag(
+        "availability", venue_id, date_from, date_to, sorted(masks.items())
     )
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    response = jsonify(
+        {
+            "venue": venue_id,
+            "from": date_from.isoformat(),
+            "to": date_to.isoformat(),
+            "first_slot": SLOT_START_TIME,
+            "slot_minutes": SLOT_LENGTH_MINUTES,
+            "days": {day.isoformat(): mask for day, mask in masks.items()},
+        }
+    )
+    response = _with_etag(response, etag)
+    # Short shared caching on top of revalidation
+    response.headers["Cache-Control"] = "public, max-age=30"
+    return response
+
+
+@main.route("/api/booking-status/<reference>/wait")
+@read_only
+def wait_booking_status(reference):
+    """Long-poll: answer once the status differs from ``since``, or on timeout.
+
+    The wait is bounded by STATUS_POLL_TIMEOUT, so even a sync worker is
+    only held for a few seconds before the page asks again.
+    """
+    broker = get_broker()
+    # Subscribe before reading so a change committed in between isn't missed
+    waiter = broker.subscribe(reference)
+    try:
+        booking = find_booking(reference)
+        if booking is None:
+            abort(404)
+        payload = status_payload(booking)
+        if payload["status"] == request.args.get("since", "pending"):
+            # Release the DB connection while the client waits
+            db.session.remove()
+            try:
+                payload = waiter.get(timeout=current_app.config["STATUS_POLL_TIMEOUT"])
+            except queue.Empty:
+                pass
+    finally:
+        broker.unsubscribe(reference, waiter)
+
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
 
 @main.route("/admin/review/<booking_id>", methods=["GET", "POST"])
@@ -251,26 +600,64 @@ def admin_review(booking_id):
 
     if form.validate_on_submit():
         # Determine action based on which button was clicked
+        old_status = booking.status
         if form.approve.data:
-            booking.status = "approved"
             action = "approved"
         elif form.reject.data:
-            booking.status = "rejected"
             action = "rejected"
         else:
             flash("Invalid action", "error")
             return redirect(url_for("main.admin_review", booking_id=booking_id))
 
-        # Update booking
-        booking.admin_response = (
-            form.admin_comments.data or f"Request {action} by admin"
+        # Claim the booking with a conditional UPDATE: of two concurrent
+        # submissions (e.g. a double-click) only one finds it still unprocessed
+        result = db.session.execute(
+            db.update(BookingRequest)
+            .where(
+                BookingRequest.id == booking.id,
+                BookingRequest.is_processed.isnot(True),
+            )
+            .values(
+                status=action,
+                admin_response=form.admin_comments.data or f"Request {action} by admin",
+                processed_at=datetime.utcnow(),
+                is_processed=True,
+            )
         )
-        booking.processed_at = datetime.utcnow()
-        booking.is_processed = True
+        if result.rowcount != 1:
+            db.session.rollback()
+            return render_template(
+                "admin/admin_already_processed.html", booking=booking
+            )
+
+        # Approvals also have to win the booking's slots in the availability index
+        # and pass the EXISTS check on the bookings themselves
+        if action == "approved" and not (
+            reserve_slots(booking)
+            and not has_conflict(
+                booking.venue_id,
+                booking.event_date,
+                booking.start_time,
+                booking.end_time,
+                exclude_id=booking.id,
+            )
+        ):
+            db.session.rollback()
+            flash(
+                "This booking overlaps an already approved booking for the same venue and cannot be approved.",
+                "error",
+            )
+            return redirect(url_for("main.admin_review", booking_id=booking_id))
+
+        record_status_change(booking, old_status)
+        update_calendar_feeds([booking])
+
+        # Queue notification to user in the same transaction
+        email_queued = send_user_notification(booking)
         db.session.commit()
+        publish_status(booking)
 
-        # Send notification to user
-        if send_user_notification(booking):
+        if email_queued:
             return render_template(
                 "admin/admin_success.html", booking=booking, action=action
             )
@@ -285,106 +672,441 @@ def admin_review(booking_id):
     return render_template("admin/admin_review.html", booking=booking, form=form)
 
 
+@main.route("/admin/series/<series_id>", methods=["GET", "POST"])
+def admin_series_review(series_id):
+    """Approve or reject every occurrence of a recurring series at once"""
+    series = BookingSeries.query.filter_by(series_id=series_id).first_or_404()
+    form = AdminResponseForm()
+
+    if not series.is_processed and form.validate_on_submit():
+        if form.approve.data:
+            action = "approved"
+        elif form.reject.data:
+            action = "rejected"
+        else:
+            flash("Invalid action", "error")
+            return redirect(url_for("main.admin_series_review", series_id=series_id))
+
+        bookings, conflicts = review_series(
+            series, action, form.admin_comments.data or f"Series {action} by admin"
+        )
+        if bookings is None:
+            db.session.rollback()
+            flash("This series was changed by someone else meanwhile.", "error")
+        elif conflicts:
+            db.session.rollback()
+            flash(
+                "The series cannot be approved because these dates overlap approved bookings: "
+                + ", ".join(d.isoformat() for d in conflicts),
+                "error",
+            )
+        elif not bookings:
+            # Every occurrence was already decided on its own, so nothing
+            # changed for the customer and review_series sent no email
+            db.session.commit()
+            flash(
+                f"Series {action}. All occurrences had already been reviewed individually, so no bookings were updated.",
+                "success",
+            )
+        else:
+            db.session.commit()
+            for booking in bookings:
+                publish_status(booking)
+            flash(
+                f"Series {action}: {len(bookings)} bookings updated and the customer notified.",
+                "success",
+            )
+        return redirect(url_for("main.admin_series_review", series_id=series_id))
+
+    # Open occurrences that an approval would currently collide with
+    pending_dates = [b.event_date for b in series.bookings if not b.is_processed]
+    conflicts = []
+    if not series.is_processed and pending_dates:
+        conflicts = find_conflicts(
+            series.venue_id, pending_dates, series.start_time, series.end_time
+        )
+
+    return render_template(
+        "admin/admin_series_review.html",
+        series=series,
+        venue=get_venue(series.venue_id),
+        form=form,
+        conflicts=set(conflicts),
+    )
+
+
+@main.route("/admin/queue", methods=["GET", "POST"])
+def admin_queue():
+    """Review many pending requests at once"""
+    form = AdminResponseForm()
+    after = request.args.get("after")
+
+    if form.validate_on_submit():
+        if form.approve.data:
+            action = "approved"
+        elif form.reject.data:
+            action = "rejected"
+        else:
+            flash("Invalid action", "error")
+            return redirect(url_for("main.admin_queue", after=after))
+
+        booking_ids = request.form.getlist("booking_ids")
+        if not booking_ids:
+            flash("Select at least one booking request.", "error")
+            return redirect(url_for("main.admin_queue", after=after))
+
+        result = review_bookings(booking_ids, action, form.admin_comments.data)
+        if result.stale:
+            db.session.rollback()
+            flash(
+                "Some of these requests were reviewed elsewhere meanwhile. Please try again.",
+                "error",
+            )
+            return redirect(url_for("main.admin_queue", after=after))
+
+        db.session.commit()
+        for booking in result.processed:
+            publish_status(booking)
+
+        message = f"{len(result.approved)} approved, {len(result.rejected)} rejected"
+        if result.auto_rejected:
+            message += (
+                f", {len(result.auto_rejected)} rejected for overlapping an approval"
+            )
+        if result.skipped:
+            message += f", {result.skipped} already processed"
+        flash(message + ".", "success")
+        return redirect(url_for("main.admin_queue", after=after))
+
+    cursor = None
+    if after:
+        try:
+            cursor = decode_cursor(after)
+        except ValueError:
+            abort(400)
+    bookings, next_cursor = pending_queue(cursor)
+
+    return render_template(
+        "admin/admin_queue.html",
+        form=form,
+        bookings=bookings,
+        after=after,
+        next_cursor=next_cursor,
+    )
+
+
+@main.route("/admin/import", methods=["GET", "POST"])
+def admin_import():
+    """Bulk import booking requests from an uploaded CSV/JSONL file"""
+    form = BulkImportForm()
+    result = None
+
+    if form.validate_on_submit():
+        upload = form.bookings_file.data
+        try:
+            rows = parse_rows(upload.stream, upload.filename or "")
+        except (ValueError, csv.Error) as e:
+            flash(f"Could not read the file: {e}", "danger")
+            return redirect(url_for("main.admin_import"))
+        result = import_bookings(rows, dry_run=form.dry_run.data)
+        if form.dry_run.data:
+            flash(
+                f"{len(rows) - len(result.errors)} of {len(rows)} rows can be imported.",
+                "success",
+            )
+        else:
+            flash(f"Imported {len(result.created)} booking requests.", "success")
+
+    return render_template("admin/admin_import.html", form=form, result=result)
+
+
 @main.route("/admin/dashboard")
 def admin_dashboard():
     """Admin dashboard with statistics"""
-    total_bookings = BookingRequest.query.count()
-    pending_bookings = BookingRequest.query.filter_by(status="pending").count()
-    approved_bookings = BookingRequest.query.filter_by(status="approved").count()
-    rejected_bookings = BookingRequest.query.filter_by(status="rejected").count()
+    stats, venue_stats = get_dashboard_stats()
 
-    # Recent bookings
+    # Recent bookings, with their venues loaded in the same query
     recent_bookings = (
-        BookingRequest.query.order_by(BookingRequest.created_at.desc()).limit(10).all()
-    )
-
-    # Popular venues
-    venue_stats = (
-        db.session.query(
-            Venue.name, db.func.count(BookingRequest.id).label("booking_count")
-        )
-        .join(BookingRequest)
-        .group_by(Venue.id, Venue.name)
-        .order_by(db.func.count(BookingRequest.id).desc())
+        BookingRequest.query.options(db.joinedload(BookingRequest.venue))
+        .order_by(BookingRequest.created_at.desc())
+        .limit(10)
         .all()
     )
 
-    stats = {
-        "total": total_bookings,
-        "pending": pending_bookings,
-        "approved": approved_bookings,
-        "rejected": rejected_bookings,
-    }
-
     return render_template(
         "admin/admin_dashboard.html",
         stats=stats,
         recent_bookings=recent_bookings,
         venue_stats=venue_stats,
+        recompute_form=RecomputeStatsForm(),
     )
 
 
-@main.route("/admin/export")
-def export_bookings():
-    """Export all bookings to CSV"""
-    bookings = BookingRequest.query.order_by(BookingRequest.created_at.desc()).all()
+@main.route("/admin/dashboard/recompute", methods=["POST"])
+def admin_recompute_stats():
+    """Verify the dashboard counters against the bookings and fix any drift"""
+    form = RecomputeStatsForm()
+    if not form.validate_on_submit():
+        abort(400)
+
+    differences = recompute_booking_stats()
+    if not differences:
+        flash("All booking counters match the bookings.", "success")
+    else:
+        venue_names = {venue.id: venue.name for venue in get_venues()}
+        corrections = [
+            f"{venue_names.get(venue_id, venue_id)} {status} {stored} → {counted}"
+            for venue_id, changed in differences.items()
+            for status, (stored, counted) in changed.items()
+        ]
+        # Drift means some code path skipped its counter update
+        flash("Corrected booking counters: " + "; ".join(corrections) + ".", "danger")
+    return redirect(url_for("main.admin_dashboard"))
 
-    output = io.StringIO()
-    writer = csv.writer(output)
 
-    # Write header
-    writer.writerow(
-        [
-            "Reference Number",
-            "Customer Name",
-            "Email",
-            "Event Title",
-            "Venue",
-            "Event Date",
-            "Start Time",
-            "End Time",
-            "Status",
-            "Created At",
-            "Processed At",
-            "Admin Response",
-        ]
+BOOKINGS_PAGE_SIZE = 50
+BOOKING_FILTER_ARGS = ("status", "venue", "from", "to")
+
+
+def _encode_event_cursor(booking):
+    return f"{booking.event_date.isoformat()}_{booking.id}"
+
+
+def _decode_event_cursor(cursor):
+    """Parse an (event_date, id) cursor; raises ValueError"""
+    event_date, booking_id = cursor.rsplit("_", 1)
+    return date_type.fromisoformat(event_date), int(booking_id)
+
+
+@main.route("/admin/bookings")
+def admin_bookings():
+    """All bookings, filtered and paged by keyset.
+
+    Without a date range the pages run newest first by (created_at, id).
+    A date range switches to event order, (event_date, id), which the
+    event_date indexes return presorted; ordering a date range by
+    creation time would need a sort of every booking in the range.
+    """
+    try:
+        filters = _booking_filters(request.args)
+    except ValueError:
+        flash("Invalid date format provided.", "danger")
+        return redirect(url_for("main.admin_bookings"))
+
+    by_event_date = bool(request.args.get("from") or request.args.get("to"))
+    if by_event_date:
+        keyset = db.tuple_(BookingRequest.event_date, BookingRequest.id)
+        order = (BookingRequest.event_date, BookingRequest.id)
+        encode, decode = _encode_event_cursor, _decode_event_cursor
+    else:
+        keyset = db.tuple_(BookingRequest.created_at, BookingRequest.id)
+        order = (BookingRequest.created_at.desc(), BookingRequest.id.desc())
+        encode, decode = encode_cursor, decode_cursor
+
+    query = BookingRequest.query.options(db.joinedload(BookingRequest.venue)).filter(
+        *filters
     )
+    after = request.args.get("after")
+    if after:
+        try:
+            position = db.tuple_(*decode(after))
+        except ValueError:
+            abort(400)
+        query = query.filter(keyset > position if by_event_date else keyset < position)
+    bookings = query.order_by(*order).limit(BOOKINGS_PAGE_SIZE + 1).all()
+    next_cursor = None
+    if len(bookings) > BOOKINGS_PAGE_SIZE:
+        bookings = bookings[:BOOKINGS_PAGE_SIZE]
+        next_cursor = encode(bookings[-1])
 
-    # Write data
-    for booking in bookings:
-        writer.writerow(
-            [
-                booking.reference_number,
-                booking.user_name,
-                booking.user_email,
-                booking.event_title,
-                booking.venue.name,
-                booking.event_date,
-                booking.start_time,
-                booking.end_time,
-                booking.status,
-                booking.created_at.strftime("%Y-%m-%d %H:%M:%S")
-                if booking.created_at
-                else "",
-                booking.processed_at.strftime("%Y-%m-%d %H:%M:%S")
-                if booking.processed_at
-                else "",
-                booking.admin_response or "",
-            ]
-        )
+    return render_template(
+        "admin/admin_bookings.html",
+        bookings=bookings,
+        venues=get_venues(),
+        filters={
+            name: request.args[name]
+            for name in BOOKING_FILTER_ARGS
+            if request.args.get(name)
+        },
+        by_event_date=by_event_date,
+        after=after,
+        next_cursor=next_cursor,
+    )
+
+
+@main.route("/admin/metrics")
+def admin_metrics():
+    """Prometheus text exposition of this process's request metrics"""
+    metrics = get_metrics()
+    if metrics is None:
+        abort(404)
+    return Response(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
-    output.seek(0)
 
-    # Create response
-    response = make_response(output.getvalue())
-    response.headers["Content-Type"] = "text/csv"
-    response.headers["Content-Disposition"] = (
-        f"attachment; filename=venue_bookings_{datetime.now().strftime('%Y%m%d')}.csv"
+EXPORT_HEADER = [
+    "Reference Number",
+    "Customer Name",
+    "Email",
+    "Event Title",
+    "Venue",
+    "Event Date",
+    "Start Time",
+    "End Time",
+    "Status",
+    "Created At",
+    "Processed At",
+    "Admin Response",
+]
+EXPORT_BATCH_SIZE = 1000
+
+
+def _booking_filters(args, model=BookingRequest):
+    """Conditions for the optional from/to/status/venue filters; raises ValueError"""
+    conditions = []
+    date_from = args.get("from")
+    if date_from:
+        date_from = datetime.strptime(date_from, "%Y-%m-%d").date()
+        conditions.append(model.event_date >= date_from)
+    date_to = args.get("to")
+    if date_to:
+        date_to = datetime.strptime(date_to, "%Y-%m-%d").date()
+        conditions.append(model.event_date <= date_to)
+    status = args.get("status")
+    if status:
+        conditions.append(model.status == status)
+    venue_id = args.get("venue", type=int)
+    if venue_id:
+        conditions.append(model.venue_id == venue_id)
+    return conditions
+
+
+def _export_query(args, model=BookingRequest):
+    """Build the export query of the live or the archived bookings"""
+    query = (
+        db.session.query(
+            model.reference_number,
+            model.user_name,
+            model.user_email,
+            model.event_title,
+            Venue.name,
+            model.event_date,
+            model.start_time,
+            model.end_time,
+            model.status,
+            model.created_at,
+            model.processed_at,
+            model.admin_response,
+        )
+        .join(Venue, model.venue_id == Venue.id)
+        .filter(*_booking_filters(args, model))
+        .order_by(model.created_at.desc())
     )
 
+    # Fetch rows from the cursor in batches instead of loading them all
+    return query.yield_per(EXPORT_BATCH_SIZE)
+
+
+def _export_csv_chunks(queries):
+    """Yield the rows of each query as CSV, one batch of rows at a time"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADER)
+
+    try:
+        rows = itertools.chain.from_iterable(queries)
+        for count, row in enumerate(rows, start=1):
+            (
+                reference_number,
+                user_name,
+                user_email,
+                event_title,
+                venue_name,
+                event_date,
+                start_time,
+                end_time,
+                status,
+                created_at,
+                processed_at,
+                admin_response,
+            ) = row
+            writer.writerow(
+                [
+                    reference_number,
+                    user_name,
+                    user_email,
+                    event_title,
+                    venue_name,
+                    event_date,
+                    start_time,
+                    end_time,
+                    status,
+                    created_at.strftime("%Y-%m-%d %H:%M:%S") if created_at else "",
+                    processed_at.strftime("%Y-%m-%d %H:%M:%S") if processed_at else "",
+                    admin_response or "",
+                ]
+            )
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+
+        yield output.getvalue()
+    finally:
+        # The view's session was removed before streaming began; iterating
+        # the query reopened it, so hand its connection back here
+        for query in queries:
+            query.session.close()
+
+
+def _gzip_chunks(chunks):
+    """Compress a stream of text chunks into a gzip byte stream"""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@main.route("/admin/export")
+def export_bookings():
+    """Stream bookings as CSV, optionally filtered and gzip-compressed"""
+    try:
+        # Live bookings newest first, then the archived ones
+        queries = [
+            _export_query(request.args),
+            _export_query(request.args, ArchivedBooking),
+        ]
+    except ValueError:
+        flash("Invalid date format provided.", "danger")
+        return redirect(url_for("main.admin_dashboard"))
+
+    filename = f"venue_bookings_{datetime.now().strftime('%Y%m%d')}.csv"
+    chunks = _export_csv_chunks(queries)
+    if request.args.get("gzip"):
+        chunks = _gzip_chunks(chunks)
+        content_type = "application/gzip"
+        filename += ".gz"
+    else:
+        content_type = "text/csv"
+
+    # Create streaming response
+    response = Response(stream_with_context(chunks), content_type=content_type)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+
     return response
 
 
+def _calendar_service():
+    # The Google client libraries take a large share of worker start-up
+    # time, so they are only imported once a calendar route is used
+    from calendar_service import CalendarService
+
+    return CalendarService()
+
+
 @main.route("/add_to_calendar/<booking_id>")
 def add_to_calendar(booking_id):
     """Redirect to Google Calendar OAuth"""
@@ -398,8 +1120,9 @@ def add_to_calendar(booking_id):
 
     # Store booking ID in session
     session["booking_id"] = booking_id
+    session.pop("calendar_series_id", None)
 
-    calendar_service = CalendarService()
+    calendar_service = _calendar_service()
     try:
         authorization_url = calendar_service.get_authorization_url()
         return redirect(authorization_url)
@@ -410,14 +1133,53 @@ def add_to_calendar(booking_id):
         )
 
 
+@main.route("/series/<reference>/add_to_calendar")
+def add_series_to_calendar(reference):
+    """Redirect to Google Calendar OAuth for all approved dates of a series"""
+    series = BookingSeries.query.filter_by(reference_number=reference).first_or_404()
+
+    if series.status != "approved":
+        flash("Only approved bookings can be added to calendar.", "error")
+        return redirect(url_for("main.series_status", reference=reference))
+
+    session["calendar_series_id"] = series.series_id
+    session.pop("booking_id", None)
+
+    calendar_service = _calendar_service()
+    try:
+        return redirect(calendar_service.get_authorization_url())
+    except Exception as e:
+        flash(f"Error setting up calendar integration: {str(e)}", "error")
+        return redirect(url_for("main.series_status", reference=reference))
+
+
+def _add_series_events(calendar_service, credentials, series_id):
+    """Push every approved date of a series in batched Calendar requests"""
+    series = BookingSeries.query.filter_by(series_id=series_id).first_or_404()
+    bookings = [b for b in series.bookings if b.status == "approved"]
+    created, errors = calendar_service.create_calendar_events(bookings, credentials)
+    if errors:
+        flash(
+            f"Added {created} of {len(bookings)} dates to your Google Calendar. {next(iter(errors.values()))}",
+            "error",
+        )
+    else:
+        flash(f"Added {created} dates to your Google Calendar successfully!", "success")
+    return redirect(url_for("main.series_status", reference=series.reference_number))
+
+
 @main.route("/oauth2callback")
 def oauth2callback():
     """Handle OAuth callback and create calendar event"""
-    calendar_service = CalendarService()
+    calendar_service = _calendar_service()
 
     try:
         credentials = calendar_service.handle_oauth_callback()
 
+        series_id = session.pop("calendar_series_id", None)
+        if series_id:
+            return _add_series_events(calendar_service, credentials, series_id)
+
         # Get booking details
         booking_id = session.get("booking_id")
         if not booking_id:
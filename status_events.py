@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Publish/subscribe channel for booking status changes.
+
+admin_review publishes after it commits, and the long-poll endpoint waits
+on a local queue until that happens or STATUS_POLL_TIMEOUT passes, so a
+waiting status page costs no queries. Within one process the LocalBroker
+is enough. With several gunicorn workers, set STATUS_PUBSUB_URL to a Redis
+URL: each process keeps one subscriber thread and fans messages out to its
+own waiters. The thread reconnects after Redis errors; a change published
+while it was away reaches the page with its next poll.
+"""
+
+import json
+import queue
+import threading
+import time
+
+from flask import current_app
+
+CHANNEL_PREFIX = "booking-status:"
+
+
+class LocalBroker:
+    """In-process broker: delivers to waiters in the current process only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = {}
+
+    def subscribe(self, reference):
+        waiter = queue.Queue()
+        with self._lock:
+            self._waiters.setdefault(reference, []).append(waiter)
+        return waiter
+
+    def unsubscribe(self, reference, waiter):
+        with self._lock:
+            waiters = self._waiters.get(reference, [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self._waiters.pop(reference, None)
+
+    def _deliver(self, reference, payload):
+        with self._lock:
+            waiters = list(self._waiters.get(reference, []))
+        for waiter in waiters:
+            waiter.put(payload)
+
+    def publish(self, reference, payload):
+        self._deliver(reference, payload)
+
+
+class RedisBroker(LocalBroker):
+    """Cross-process broker on top of Redis pub/sub"""
+
+    def __init__(self, url, logger, retry_max=30):
+        super().__init__()
+        import redis
+
+        self._logger = logger
+        self._retry_max = retry_max
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._thread = threading.Thread(
+            target=self._listen, name="status-events", daemon=True
+        )
+        self._thread.start()
+
+    def _listen(self):
+        delay = 1
+        while True:
+            try:
+                # Subscribes again on a fresh connection after an error
+                self._pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                for message in self._pubsub.listen():
+                    delay = 1
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    self._deliver(
+                        channel[len(CHANNEL_PREFIX) :], json.loads(message["data"])
+                    )
+            except Exception as e:
+                self._logger.error(
+                    f"Status event subscription failed, retrying in {delay}s: {e}"
+                )
+                self._pubsub.reset()
+                time.sleep(delay)
+                delay = min(delay * 2, self._retry_max)
+
+    def publish(self, reference, payload):
+        self._redis.publish(f"{CHANNEL_PREFIX}{reference}", json.dumps(payload))
+
+
+def init_status_events(app):
+    """Attach the configured broker to the app"""
+    url = app.config.get("STATUS_PUBSUB_URL")
+    if url:
+        broker = RedisBroker(url, app.logger, app.config["STATUS_PUBSUB_RETRY_MAX"])
+    else:
+        broker = LocalBroker()
+    app.extensions["status_events"] = broker
+    return broker
+
+
+def get_broker():
+    return current_app.extensions["status_events"]
+
+
+def status_payload(booking):
+    """The status document shared by the JSON API and the long-poll"""
+    return {"status": booking.status, "admin_response": booking.admin_response or ""}
+
+
+def publish_status(booking):
+    """Notify waiting clients about a committed status change"""
+    try:
+        get_broker().publish(booking.reference_number, status_payload(booking))
+    except Exception as e:
+        current_app.logger.error(f"Error publishing booking status: {e}")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Optional template compilation ahead of the first request.
+
+Jinja compiles a template to Python the first time it is rendered, which
+puts the cost on whichever request hits each page first in every worker.
+JINJA_BYTECODE_CACHE_DIR keeps the compiled code on disk so new workers
+and restarts skip the compile step, and TEMPLATE_PREWARM loads every
+template in create_app. With gunicorn --preload the pre-warmed
+environment is shared by the forked workers.
+"""
+
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+TEMPLATE_EXTENSIONS = ("html", "txt")
+
+
+def warm_templates(app):
+    """Compile (or load from the bytecode cache) every template; returns the count"""
+    names = app.jinja_env.list_templates(extensions=TEMPLATE_EXTENSIONS)
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def init_template_cache(app):
+    cache_dir = app.config["JINJA_BYTECODE_CACHE_DIR"]
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    if app.config["TEMPLATE_PREWARM"]:
+        warm_templates(app)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from config import Config  # noqa: E402
+from database import init_database  # noqa: E402
+from models import db, BookingRequest  # noqa: E402
+
+
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = "test-secret"
+    REFERENCE_KEY = "test-reference-key"
+    WTF_CSRF_ENABLED = False
+    MAIL_SUPPRESS_SEND = True
+    MAIL_OUTBOX_WORKERS = 0
+    MAIL_USERNAME = "bookings@example.com"
+    ADMIN_EMAIL = "admin@example.com"
+    DATABASE_REPLICA_URLS = None
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    # A file, not sqlite://, so separate connections really contend for locks
+    return f"sqlite:///{tmp_path / 'bookings.db'}"
+
+
+@pytest.fixture
+def make_app(database_url):
+    """Build an app on a fresh database; keyword arguments override config"""
+    apps = []
+
+    def factory(**settings):
+        config = type(
+            "Config",
+            (TestConfig,),
+            {"SQLALCHEMY_DATABASE_URI": database_url, **settings},
+        )
+        app = create_app(config)
+        init_database(app)
+        apps.append(app)
+        return app
+
+    yield factory
+    for app in apps:
+        outbox = app.extensions.get("email_outbox")
+        if outbox:
+            outbox.stop(timeout=5)
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def event_date():
+    return date.today() + timedelta(days=7)
+
+
+@pytest.fixture
+def book(app, client, event_date):
+    """Submit the booking form; returns the new BookingRequest's booking_id"""
+
+    def submit(start_time="10:00", end_time="11:00", venue_id=1, **fields):
+        data = {
+            "user_name": "Ada Lovelace",
+            "user_email": "ada@example.com",
+            "venue_id": venue_id,
+            "event_date": fields.pop("event_date", event_date).isoformat(),
+            "start_time": start_time,
+            "end_time": end_time,
+            "event_title": "Study group",
+            **fields,
+        }
+        response = client.post("/book", data=data)
+        assert response.status_code == 302, response.data
+        with app.app_context():
+            booking = BookingRequest.query.order_by(BookingRequest.id.desc()).first()
+            return booking.booking_id
+
+    return submit
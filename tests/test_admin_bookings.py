@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+from datetime import timedelta
+
+import pytest
+
+from models import BookingRequest
+
+PAGE_LINK = re.compile(r'href="(/admin/bookings\?[^"]*after=[^"]*)"')
+
+
+@pytest.fixture
+def bookings(app, book, event_date):
+    for day in range(6):
+        for start, end in (("10:00", "11:00"), ("12:00", "13:00")):
+            book(start, end, event_date=event_date + timedelta(days=day % 3))
+    with app.app_context():
+        return [
+            (b.reference_number, b.event_date, b.id, b.created_at)
+            for b in BookingRequest.query
+        ]
+
+
+def _walk(app, url, monkeypatch):
+    """Follow the next-page links; returns the references in page order"""
+    monkeypatch.setattr("routes.BOOKINGS_PAGE_SIZE", 5)
+    # Not the booking client, whose flashed messages repeat references
+    client = app.test_client()
+    references = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        html = response.data.decode()
+        references += re.findall(r"\b(VB\d{7})\b", html)
+        match = PAGE_LINK.search(html)
+        url = match.group(1).replace("&amp;", "&") if match else None
+    return references
+
+
+def test_pages_run_newest_first(app, bookings, monkeypatch):
+    expected = [ref for ref, _, _, _ in sorted(bookings, key=lambda b: (b[3], b[2]))]
+    assert _walk(app, "/admin/bookings", monkeypatch) == expected[::-1]
+
+
+def test_date_range_pages_run_in_event_order(app, bookings, event_date, monkeypatch):
+    date_from, date_to = event_date, event_date + timedelta(days=1)
+    expected = [
+        ref
+        for ref, day, _, _ in sorted(bookings, key=lambda b: (b[1], b[2]))
+        if date_from <= day <= date_to
+    ]
+    url = f"/admin/bookings?from={date_from}&to={date_to}"
+    assert _walk(app, url, monkeypatch) == expected
+
+
+def test_bad_cursor_is_rejected(client, event_date):
+    assert client.get("/admin/bookings?after=nonsense").status_code == 400
+    assert (
+        client.get(f"/admin/bookings?from={event_date}&after=nonsense").status_code
+        == 400
+    )
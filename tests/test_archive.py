@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import date, timedelta
+
+import pytest
+
+from archive import archive_bookings, archive_cutoff
+from models import db, ArchivedBooking, BookingRequest
+
+
+@pytest.fixture
+def past_booking(app, client, book):
+    """An approved booking whose event is old enough to archive"""
+    booking_id = book("10:00", "11:00")
+    client.post(f"/admin/review/{booking_id}", data={"approve": "y"})
+    with app.app_context():
+        booking = BookingRequest.query.filter_by(booking_id=booking_id).one()
+        booking.event_date = date.today() - timedelta(days=400)
+        db.session.commit()
+        return booking.reference_number
+
+
+def test_archiving_moves_processed_past_bookings(app, book, past_booking):
+    book("12:00", "13:00")  # Pending and upcoming: stays
+    with app.app_context():
+        assert archive_bookings(archive_cutoff()) == 1
+        assert archive_bookings(archive_cutoff()) == 0
+        assert ArchivedBooking.query.one().reference_number == past_booking
+        assert BookingRequest.query.count() == 1
+
+
+def test_archived_booking_page_revalidates_to_new_etag(app, past_booking):
+    client = app.test_client()
+    url = f"/booking/{past_booking}"
+    live = client.get(url)
+    assert b"/add_to_calendar/" in live.data
+
+    with app.app_context():
+        archive_bookings(archive_cutoff())
+
+    archived = client.get(url, headers={"If-None-Match": live.headers["ETag"]})
+    assert archived.status_code == 200
+    assert archived.headers["ETag"] != live.headers["ETag"]
+    assert b"/add_to_calendar/" not in archived.data
+
+    api = client.get(f"/api/booking-status/{past_booking}")
+    assert api.json["status"] == "approved"
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from availability import has_conflict
+from models import db, BookingRequest, VenueAvailability
+
+
+def _approve(app, booking_id):
+    client = app.test_client()
+    return client.post(f"/admin/review/{booking_id}", data={"approve": "y"})
+
+
+def _drop_bitmaps(app):
+    """Stale derived data: the bitmaps no longer show the approved bookings"""
+    with app.app_context():
+        VenueAvailability.query.delete()
+        db.session.commit()
+
+
+def test_has_conflict_checks_minute_overlap(app, book, event_date):
+    booking_id = book("10:00", "11:00")
+    _approve(app, booking_id)
+
+    with app.app_context():
+        booking = BookingRequest.query.filter_by(booking_id=booking_id).one()
+        assert has_conflict(1, event_date, "10:30", "11:30")
+        assert not has_conflict(1, event_date, "11:00", "12:00")
+        assert not has_conflict(2, event_date, "10:00", "11:00")
+        assert not has_conflict(1, event_date, "10:00", "11:00", booking.id)
+
+
+def test_booking_form_rejects_overlap_missing_from_bitmap(app, book, event_date):
+    _approve(app, book("10:00", "11:00"))
+    _drop_bitmaps(app)
+
+    response = app.test_client().post(
+        "/book",
+        data={
+            "user_name": "Grace Hopper",
+            "user_email": "grace@example.com",
+            "venue_id": 1,
+            "event_date": event_date.isoformat(),
+            "start_time": "10:30",
+            "end_time": "11:30",
+            "event_title": "Compiler talk",
+        },
+    )
+
+    assert response.status_code == 200
+    assert b"conflicts with an existing booking" in response.data
+    with app.app_context():
+        assert BookingRequest.query.count() == 1
+
+
+def test_approval_refuses_overlap_missing_from_bitmap(app, book):
+    first = book("10:00", "11:00")
+    second = book("10:30", "11:30")
+    _approve(app, first)
+    _drop_bitmaps(app)
+
+    _approve(app, second)
+
+    with app.app_context():
+        booking = BookingRequest.query.filter_by(booking_id=second).one()
+        assert booking.status == "pending"
+        assert not booking.is_processed
+
+
+def test_venues_page_shows_no_badges_for_an_invalid_date(client):
+    response = client.get("/venues?date=foo")
+
+    assert response.status_code == 200
+    assert b"Invalid date format provided." in response.data
+    assert b"h free" not in response.data
+    assert b"Showing availability for" not in response.data
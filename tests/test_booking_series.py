@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+import pytest
+
+from models import BookingRequest, BookingSeries, EmailOutbox
+
+
+@pytest.fixture
+def book_series(event_date):
+    def submit(client, weeks):
+        response = client.post(
+            "/book/series",
+            data={
+                "user_name": "Ada Lovelace",
+                "user_email": "ada@example.com",
+                "venue_id": 1,
+                "event_date": event_date.isoformat(),
+                "until_date": (event_date + timedelta(weeks=weeks - 1)).isoformat(),
+                "interval_weeks": 1,
+                "start_time": "10:00",
+                "end_time": "11:00",
+                "event_title": "Weekly seminar",
+                "excluded_dates": "",
+            },
+        )
+        assert response.status_code == 302
+
+    return submit
+
+
+def test_series_spanning_several_reference_blocks(make_app, book_series):
+    # Ten occurrences plus the series itself need three blocks of five
+    app = make_app(REFERENCE_BLOCK_SIZE=5)
+    book_series(app.test_client(), weeks=10)
+
+    with app.app_context():
+        series = BookingSeries.query.one()
+        references = {series.reference_number} | {
+            booking.reference_number
+            for booking in BookingRequest.query.filter_by(series_id=series.id)
+        }
+    assert len(references) == 11
+
+
+def _customer_emails():
+    return EmailOutbox.query.filter(
+        EmailOutbox.recipients.contains("ada@example.com")
+    ).count()
+
+
+def test_series_review_after_every_occurrence_was_decided(app, client, book_series):
+    book_series(client, weeks=2)
+    with app.app_context():
+        series_id = BookingSeries.query.one().series_id
+        booking_ids = [b.booking_id for b in BookingRequest.query]
+    for booking_id in booking_ids:
+        client.post(f"/admin/review/{booking_id}", data={"approve": "y"})
+    with app.app_context():
+        emails = _customer_emails()
+
+    response = app.test_client().post(
+        f"/admin/series/{series_id}",
+        data={"approve": "y"},
+        follow_redirects=True,
+    )
+
+    assert b"no bookings were updated" in response.data
+    assert b"customer notified" not in response.data
+    with app.app_context():
+        assert BookingSeries.query.one().status == "approved"
+        assert _customer_emails() == emails
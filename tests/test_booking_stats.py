@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+from datetime import timedelta
+
+from sqlalchemy import event
+
+from booking_stats import get_dashboard_stats, recompute_booking_stats
+from models import db, VenueBookingStats
+
+
+def _corrupt_counter(app, venue_id=1, pending=42):
+    with app.app_context():
+        db.session.execute(
+            db.update(VenueBookingStats)
+            .where(VenueBookingStats.venue_id == venue_id)
+            .values(pending=pending)
+        )
+        db.session.commit()
+
+
+def _pending(app, venue_id=1):
+    with app.app_context():
+        return db.session.get(VenueBookingStats, venue_id).pending
+
+
+def test_dashboard_get_never_recomputes(app, client, book):
+    book()
+    _corrupt_counter(app)
+    assert client.get("/admin/dashboard?recompute=1").status_code == 200
+    assert _pending(app) == 42
+
+
+def test_recompute_requires_csrf_token(make_app):
+    app = make_app(WTF_CSRF_ENABLED=True)
+    _corrupt_counter(app)
+    response = app.test_client().post("/admin/dashboard/recompute")
+    assert response.status_code == 400
+    assert _pending(app) == 42
+
+
+def test_recompute_reports_and_fixes_drift(app, client, book):
+    book()
+    _corrupt_counter(app)
+
+    response = client.post("/admin/dashboard/recompute", follow_redirects=True)
+    assert response.status_code == 200
+    assert "pending 42 → 1" in response.data.decode()
+    assert _pending(app) == 1
+
+    response = client.post("/admin/dashboard/recompute", follow_redirects=True)
+    assert b"All booking counters match the bookings." in response.data
+
+
+def test_recompute_keeps_concurrent_increments(app, event_date):
+    errors = []
+    done = threading.Event()
+
+    def create_bookings(venue_id):
+        client = app.test_client()
+        for day in range(10):
+            response = client.post(
+                "/book",
+                data={
+                    "user_name": "Ada Lovelace",
+                    "user_email": "ada@example.com",
+                    "venue_id": venue_id,
+                    "event_date": (event_date + timedelta(days=day)).isoformat(),
+                    "start_time": "10:00",
+                    "end_time": "11:00",
+                    "event_title": "Study group",
+                },
+            )
+            if response.status_code != 302:
+                errors.append(response.status_code)
+
+    def recompute():
+        while not done.is_set():
+            with app.app_context():
+                recompute_booking_stats()
+
+    bookers = [threading.Thread(target=create_bookings, args=(v,)) for v in (1, 2)]
+    recounter = threading.Thread(target=recompute)
+    recounter.start()
+    for thread in bookers:
+        thread.start()
+    for thread in bookers:
+        thread.join()
+    done.set()
+    recounter.join()
+
+    assert errors == []
+    with app.app_context():
+        assert recompute_booking_stats() == {}
+        assert get_dashboard_stats()[0]["pending"] == 20
+
+
+def test_first_booking_of_a_venue_survives_a_concurrent_insert(app, book):
+    # The venue's stats row appears between _adjust's UPDATE and its INSERT
+    with app.app_context():
+        VenueBookingStats.query.delete()
+        db.session.commit()
+        engine = db.engine
+
+    inserted = []
+
+    def insert_first(conn, cursor, statement, parameters, context, executemany):
+        # Right after the UPDATE missed, as another request's commit would
+        if (
+            statement.startswith("UPDATE venue_booking_stats")
+            and cursor.rowcount == 0
+            and not inserted
+        ):
+            inserted.append(True)
+            conn.connection.cursor().execute(
+                "INSERT INTO venue_booking_stats (venue_id, pending, approved, rejected)"
+                " VALUES (1, 1, 0, 0)"
+            )
+
+    event.listen(engine, "after_cursor_execute", insert_first)
+    try:
+        book()
+    finally:
+        event.remove(engine, "after_cursor_execute", insert_first)
+
+    assert inserted
+    assert _pending(app) == 2
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+import pytest
+
+from bulk_import import import_bookings, parse_rows
+from models import BookingRequest
+
+
+@pytest.fixture
+def row(event_date):
+    return {
+        "user_name": "Ada Lovelace",
+        "user_email": "ada@example.com",
+        "venue_id": 1,
+        "event_date": event_date.isoformat(),
+        "start_time": "10:00",
+        "end_time": "11:00",
+        "event_title": "Study group",
+    }
+
+
+def _jsonl(*values):
+    return "\n".join(json.dumps(value) for value in values).encode()
+
+
+@pytest.mark.parametrize(
+    "bad, message",
+    [
+        ([1, 2], "expected an object"),
+        ("10:00", "expected an object"),
+        ({"start_time": 1000}, "start_time must be a string"),
+        ({"end_time": ["11:00"]}, "end_time must be a string"),
+        ({"user_name": 5}, "user_name must be a string"),
+        ({"event_date": 20260101}, "event_date must be a string"),
+        ({"event_description": {"text": "hi"}}, "event_description must be a string"),
+    ],
+)
+def test_malformed_rows_are_reported_per_row(app, row, bad, message):
+    bad_row = dict(row, **bad) if isinstance(bad, dict) else bad
+    with app.app_context():
+        rows = parse_rows(io.BytesIO(_jsonl(row, bad_row)), "rows.jsonl")
+        result = import_bookings(rows, dry_run=True)
+    assert len(result.errors) == 1
+    number, error = result.errors[0]
+    assert number == 2
+    assert message in error
+
+
+def test_upload_with_malformed_lines_imports_the_rest(app, client, row):
+    upload = _jsonl([1, 2], row, dict(row, start_time=10, end_time="12:00"))
+    response = client.post(
+        "/admin/import",
+        data={"bookings_file": (io.BytesIO(upload), "rows.jsonl")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    assert b"Imported 1 booking requests." in response.data
+    with app.app_context():
+        assert BookingRequest.query.count() == 1
+
+
+def test_broken_json_line_is_a_row_error(app, row):
+    upload = b"\n".join(
+        [_jsonl(row), b"{bad", _jsonl(dict(row, start_time="12:00", end_time="13:00"))]
+    )
+    with app.app_context():
+        rows = parse_rows(io.BytesIO(upload), "rows.jsonl")
+        result = import_bookings(rows)
+        assert BookingRequest.query.count() == 2
+    assert len(result.created) == 2
+    assert len(result.errors) == 1
+    number, error = result.errors[0]
+    assert number == 2
+    assert error.startswith("invalid JSON: ")
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import date, timedelta
+
+from archive import archive_bookings, archive_cutoff
+from ics_feeds import rebuild_calendar_feeds
+from models import db, BookingRequest, CalendarFeed
+
+
+def test_venue_feed_without_approvals_is_served_without_a_write(app, client, book):
+    book("10:00", "11:00")  # Pending only
+
+    response = client.get("/calendar/venue/1.ics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/calendar"
+    assert b"BEGIN:VCALENDAR" in response.data
+    assert b"BEGIN:VEVENT" not in response.data
+    with app.app_context():
+        assert CalendarFeed.query.count() == 0
+
+
+def test_archived_events_survive_a_feed_rebuild(app, client, book):
+    booking_id = book("10:00", "11:00", event_title="Old seminar")
+    client.post(f"/admin/review/{booking_id}", data={"approve": "y"})
+    with app.app_context():
+        booking = BookingRequest.query.filter_by(booking_id=booking_id).one()
+        booking.event_date = date.today() - timedelta(days=400)
+        db.session.commit()
+        assert archive_bookings(archive_cutoff()) == 1
+        # What init_database does on the next start
+        rebuild_calendar_feeds()
+
+    feed = app.test_client().get("/calendar/venue/1.ics")
+    assert f"UID:{booking_id}@".encode() in feed.data
+    assert b"SUMMARY:Old seminar" in feed.data
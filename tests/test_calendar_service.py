@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import uuid
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+
+from google.oauth2.credentials import Credentials  # noqa: E402
+
+from calendar_service import CALENDAR_BATCH_SIZE, CalendarService  # noqa: E402
+
+
+class _BatchHandler(BaseHTTPRequestHandler):
+    """Answers Calendar batch requests, recording each batch's inner requests"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        boundary = self.headers.get_param("boundary")
+        parts = [part for part in body.split(f"--{boundary}") if "Content-ID:" in part]
+        self.server.batches.append((self.path, parts))
+        out = []
+        for part in parts:
+            content_id = part.split("Content-ID: <", 1)[1].split(">", 1)[0]
+            out.append(
+                "--stub\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n"
+                f'{{"id": "{uuid.uuid4().hex}"}}\r\n'
+            )
+        data = ("".join(out) + "--stub--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/mixed; boundary=stub")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def calendar_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BatchHandler)
+    server.daemon_threads = True
+    server.batches = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _bookings(count):
+    return [
+        SimpleNamespace(
+            venue_id=1,
+            reference_number=f"VB{number:07d}",
+            event_title="Study group",
+            event_description="",
+            event_date=date(2026, 11, 2),
+            start_time="10:00",
+            end_time="11:00",
+        )
+        for number in range(count)
+    ]
+
+
+def test_events_are_inserted_in_batches_of_fifty(make_app, calendar_api):
+    app = make_app(
+        GOOGLE_CALENDAR_ROOT_URL=f"http://127.0.0.1:{calendar_api.server_address[1]}/"
+    )
+    bookings = _bookings(2 * CALENDAR_BATCH_SIZE + 20)
+
+    with app.test_request_context():
+        created, errors = CalendarService().create_calendar_events(
+            bookings, Credentials(token="token-a")
+        )
+        # Another user's credentials on the same thread get their own service
+        CalendarService().create_calendar_events(
+            bookings[:1], Credentials(token="token-b")
+        )
+
+    assert (created, errors) == (len(bookings), {})
+    sizes = [len(parts) for _, parts in calendar_api.batches]
+    assert sizes == [CALENDAR_BATCH_SIZE, CALENDAR_BATCH_SIZE, 20, 1]
+    assert all(path.startswith("/batch/") for path, _ in calendar_api.batches)
+    assert all("Bearer token-a" in part for part in calendar_api.batches[0][1])
+    assert "Bearer token-b" in calendar_api.batches[-1][1][0]
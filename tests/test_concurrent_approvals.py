@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+
+from models import BookingRequest, EmailOutbox, VenueAvailability
+from availability import slot_mask
+
+THREADS = 8
+
+
+def _approve_all(app, booking_ids):
+    """Post one approval per booking id, all released at the same moment"""
+    barrier = threading.Barrier(len(booking_ids))
+    statuses = []
+
+    def approve(booking_id):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post(f"/admin/review/{booking_id}", data={"approve": "y"})
+        statuses.append(response.status_code)
+
+    threads = [
+        threading.Thread(target=approve, args=(booking_id,))
+        for booking_id in booking_ids
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def test_overlapping_approvals_never_double_book(app, book, event_date):
+    booking_ids = [book("10:00", "11:00") for _ in range(THREADS)]
+
+    statuses = _approve_all(app, booking_ids)
+
+    assert len(statuses) == THREADS
+    assert all(status in (200, 302) for status in statuses)
+    with app.app_context():
+        approved = BookingRequest.query.filter_by(status="approved").all()
+        entry = VenueAvailability.query.filter_by(
+            venue_id=1, event_date=event_date
+        ).one()
+    assert len(approved) == 1
+    assert entry.slot_mask == slot_mask("10:00", "11:00")
+
+
+def test_double_submitted_approval_is_processed_once(app, book):
+    booking_id = book("14:00", "15:00")
+
+    statuses = _approve_all(app, [booking_id] * THREADS)
+
+    assert all(status == 200 for status in statuses)
+    with app.app_context():
+        booking = BookingRequest.query.filter_by(booking_id=booking_id).one()
+        assert booking.status == "approved"
+        # Only the winning request notified the user
+        notifications = EmailOutbox.query.filter(
+            EmailOutbox.recipients.contains("ada@example.com")
+        ).count()
+    assert notifications == 1
+
+
+def test_adjacent_approvals_all_succeed(app, book, event_date):
+    slots = [("09:00", "10:00"), ("10:00", "11:00"), ("11:00", "12:00")]
+    booking_ids = [book(start, end) for start, end in slots]
+
+    _approve_all(app, booking_ids)
+
+    with app.app_context():
+        statuses = {b.status for b in BookingRequest.query}
+        entry = VenueAvailability.query.filter_by(
+            venue_id=1, event_date=event_date
+        ).one()
+    assert statuses == {"approved"}
+    assert entry.slot_mask == slot_mask("09:00", "12:00")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from database import SUPERSEDED_INDEXES, migrate_database
+from models import db, BookingRequest
+
+
+def _index_names():
+    return {
+        index["name"] for index in db.inspect(db.engine).get_indexes("booking_request")
+    }
+
+
+def test_migrate_drops_superseded_indexes(app):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.text(
+                    "CREATE INDEX ix_booking_request_status ON booking_request (status)"
+                )
+            )
+            conn.execute(
+                db.text(
+                    "CREATE INDEX ix_booking_request_created_at "
+                    "ON booking_request (created_at)"
+                )
+            )
+
+        migrate_database()
+
+        names = _index_names()
+    assert not names & set(SUPERSEDED_INDEXES)
+    assert {index.name for index in BookingRequest.__table__.indexes} <= names
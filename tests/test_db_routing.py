@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import pytest
+
+from db_routing import PRIMARY_COOKIE
+from models import db, BookingRequest
+
+
+@pytest.fixture
+def replica_app(make_app, tmp_path):
+    """An app whose only replica is a snapshot taken right after set-up"""
+    replica = tmp_path / "replica.db"
+    app = make_app(DATABASE_REPLICA_URLS=f"sqlite:///{replica}")
+    with app.app_context():
+        primary = db.engine.url.database
+    # A replica that stopped replicating: it has the venues, never the bookings
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+    return app
+
+
+def test_booker_reads_own_booking_while_replica_lags(replica_app, event_date):
+    booker = replica_app.test_client()
+    response = booker.post(
+        "/book",
+        data={
+            "user_name": "Ada Lovelace",
+            "user_email": "ada@example.com",
+            "venue_id": 1,
+            "event_date": event_date.isoformat(),
+            "start_time": "10:00",
+            "end_time": "11:00",
+            "event_title": "Study group",
+        },
+    )
+    assert response.status_code == 302
+    assert PRIMARY_COOKIE in response.headers["Set-Cookie"]
+    with replica_app.app_context():
+        reference = BookingRequest.query.one().reference_number
+
+    # The cookie sends the booker's reads to the primary
+    assert booker.get(f"/booking/{reference}").status_code == 200
+    assert booker.get(f"/api/booking-status/{reference}").status_code == 200
+
+    # Anyone else reads from the stale replica
+    other = replica_app.test_client()
+    assert other.get(f"/booking/{reference}").status_code == 404
+    assert other.get(f"/api/booking-status/{reference}").status_code == 404
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from models import EmailOutbox
+
+
+def _sender_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("outbox-sender-")]
+
+
+@pytest.fixture
+def smtp_server():
+    """A local SMTP server; yields (port, list of received envelopes)"""
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    received = []
+
+    class Handler:
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope)
+            return "250 Message accepted for delivery"
+
+    # The controller checks its own port on start, so it can't take port 0
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    controller = controller_module.Controller(
+        Handler(), hostname="127.0.0.1", port=port
+    )
+    controller.start()
+    yield port, received
+    controller.stop()
+
+
+@pytest.fixture
+def outbox_app(make_app, smtp_server):
+    port, _ = smtp_server
+    return make_app(
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=port,
+        MAIL_USE_TLS=False,
+        MAIL_SUPPRESS_SEND=False,
+        MAIL_OUTBOX_WORKERS=2,
+        MAIL_OUTBOX_POLL_INTERVAL=0.1,
+    )
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_create_app_starts_no_senders(outbox_app):
+    assert _sender_threads() == []
+
+
+def test_cli_commands_start_no_senders(outbox_app):
+    result = outbox_app.test_cli_runner().invoke(args=["archive-bookings", "--dry-run"])
+    assert result.exit_code == 0, result.output
+    assert _sender_threads() == []
+
+
+def test_cli_commands_send_the_mail_they_queue(
+    outbox_app, smtp_server, tmp_path, event_date
+):
+    _, received = smtp_server
+    rows = tmp_path / "rows.jsonl"
+    rows.write_text(
+        json.dumps(
+            {
+                "user_name": "Ada Lovelace",
+                "user_email": "ada@example.com",
+                "venue_id": 1,
+                "event_date": event_date.isoformat(),
+                "start_time": "10:00",
+                "end_time": "11:00",
+                "event_title": "Study group",
+            }
+        )
+    )
+
+    result = outbox_app.test_cli_runner().invoke(args=["import-bookings", str(rows)])
+
+    assert result.exit_code == 0, result.output
+    assert _sender_threads() == []
+    # Delivered before the command returned, with no sender thread running
+    assert len(received) == 1
+    assert received[0].rcpt_tos == ["admin@example.com"]
+    with outbox_app.app_context():
+        assert {entry.status for entry in EmailOutbox.query} == {"sent"}
+
+
+def test_first_request_starts_senders_that_deliver(outbox_app, smtp_server):
+    _, received = smtp_server
+    client = outbox_app.test_client()
+    assert client.get("/").status_code == 200
+    assert len(_sender_threads()) == 2
+
+    # Later requests reuse the running pool
+    client.get("/")
+    assert len(_sender_threads()) == 2
+
+    with outbox_app.app_context():
+        from email_outbox import queue_message
+        from flask_mail import Message
+        from models import db
+
+        queue_message(
+            Message(
+                subject="Outbox test",
+                sender="bookings@example.com",
+                recipients=["ada@example.com"],
+                body="Hello",
+            )
+        )
+        db.session.commit()
+
+    assert _wait_for(lambda: received)
+    assert received[0].rcpt_tos == ["ada@example.com"]
+    assert b"Outbox test" in received[0].content
+
+    def sent():
+        with outbox_app.app_context():
+            return {entry.status for entry in EmailOutbox.query} == {"sent"}
+
+    assert _wait_for(sent)
+    assert len(received) == 1
+
+
+def test_forked_process_starts_its_own_senders(outbox_app):
+    pool = outbox_app.extensions["email_outbox"]
+    pool.ensure_started()
+    parent_threads, parent_stop = list(pool._threads), pool._stop
+
+    # What a worker forked from a process with running senders would see
+    pool._pid = -1
+    pool.ensure_started()
+
+    assert pool._threads and not set(pool._threads) & set(parent_threads)
+    parent_stop.set()
+    for thread in parent_threads:
+        thread.join(timeout=5)
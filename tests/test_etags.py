@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from contextlib import contextmanager
+
+import pytest
+from flask import template_rendered
+
+from models import db, BookingRequest, Venue
+
+
+@contextmanager
+def _rendered(app):
+    templates = []
+
+    def record(sender, template, context, **extra):
+        templates.append(template.name)
+
+    with template_rendered.connected_to(record, app):
+        yield templates
+
+
+@pytest.fixture
+def reference(app, book):
+    booking_id = book("10:00", "11:00")
+    with app.app_context():
+        return (
+            BookingRequest.query.filter_by(booking_id=booking_id).one().reference_number
+        )
+
+
+@pytest.fixture
+def approve(app, client):
+    def submit(reference):
+        with app.app_context():
+            booking_id = (
+                BookingRequest.query.filter_by(reference_number=reference)
+                .one()
+                .booking_id
+            )
+        response = client.post(f"/admin/review/{booking_id}", data={"approve": "y"})
+        assert response.status_code == 200
+
+    return submit
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/booking/{reference}",
+        "/api/booking-status/{reference}",
+        "/venues?date={date}",
+    ],
+)
+def test_etag_revalidation(app, reference, approve, event_date, url):
+    url = url.format(reference=reference, date=event_date.isoformat())
+    # A browser other than the booker's, whose session still holds a flash
+    client = app.test_client()
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    with _rendered(app) as templates:
+        repeat = client.get(url, headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.data == b""
+    assert templates == []
+
+    approve(reference)
+
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_unknown_reference_is_not_found(client):
+    assert client.get("/booking/VB0000000").status_code == 404
+    assert client.get("/api/booking-status/VB0000000").status_code == 404
+
+
+def test_venue_rename_invalidates_the_booking_page(app, reference):
+    client = app.test_client()
+    url = f"/booking/{reference}"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+
+    with app.app_context():
+        db.session.get(Venue, 1).name = "Renamed Hall"
+        db.session.commit()
+
+    renamed = client.get(url, headers={"If-None-Match": etag})
+    assert renamed.status_code == 200
+    assert renamed.headers["ETag"] != etag
+    assert b"Renamed Hall" in renamed.data
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+
+import pytest
+
+from models import db
+
+
+@pytest.mark.parametrize("url", ["/admin/export", "/admin/export?status=pending"])
+def test_export_returns_its_connection_after_streaming(app, client, book, url):
+    book("10:00", "11:00")
+    book("12:00", "13:00")
+
+    for _ in range(3):
+        response = client.get(url)
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert len(rows) == 3
+
+    with app.app_context():
+        assert db.engine.pool.checkedout() == 0
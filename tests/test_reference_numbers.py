@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from app import create_app
+from models import db, ReferenceSequence
+from reference_numbers import (
+    DOMAIN,
+    generate_reference_number,
+    key_fingerprint,
+    permute,
+)
+from conftest import TestConfig
+
+
+def test_permutation_is_collision_free():
+    values = {permute(b"key", number) for number in range(20000)}
+    assert len(values) == 20000
+    assert all(0 <= value < DOMAIN for value in values)
+    with pytest.raises(ValueError):
+        permute(b"key", DOMAIN)
+
+
+def test_references_record_the_key_fingerprint(app):
+    with app.app_context():
+        references = {generate_reference_number() for _ in range(250)}
+        sequence = db.session.get(ReferenceSequence, 1)
+    assert len(references) == 250
+    assert sequence.key_fingerprint == key_fingerprint(b"test-reference-key")
+
+
+def test_changed_key_refuses_to_start(make_app, book):
+    book()  # Reserves a block under the fixture's key
+    with pytest.raises(RuntimeError, match="REFERENCE_KEY"):
+        make_app(REFERENCE_KEY="rotated")
+
+
+def test_changed_key_refuses_to_reserve(app, book, database_url):
+    book()
+    # A worker started without init_database, as under gunicorn
+    config = type(
+        "Config",
+        (TestConfig,),
+        {"SQLALCHEMY_DATABASE_URI": database_url, "REFERENCE_KEY": None},
+    )
+    other = create_app(config)
+    with other.app_context():
+        with pytest.raises(RuntimeError, match="REFERENCE_KEY"):
+            generate_reference_number()
+        # The failed reservation was rolled back
+        assert db.session.get(ReferenceSequence, 1).next_value == 100
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_counter_without_fingerprint_adopts_the_key(app):
+    with app.app_context():
+        db.session.add(ReferenceSequence(id=1, next_value=500))
+        db.session.commit()
+        generate_reference_number()
+        sequence = db.session.get(ReferenceSequence, 1)
+        db.session.refresh(sequence)
+    assert sequence.next_value == 600
+    assert sequence.key_fingerprint == key_fingerprint(b"test-reference-key")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from models import BookingRequest
+from status_events import RedisBroker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Another worker process publishing a status change, repeatedly so that a
+# subscriber still (re)connecting picks up one of the copies
+PUBLISHER = """
+import logging, sys, time
+sys.path.insert(0, sys.argv[1])
+from status_events import RedisBroker
+
+broker = RedisBroker(sys.argv[2], logging.getLogger("publisher"))
+for _ in range(100):
+    broker.publish(sys.argv[3], {"status": "approved", "admin_response": "ok"})
+    time.sleep(0.1)
+"""
+
+
+@pytest.fixture
+def reference(app, book):
+    booking_id = book("10:00", "11:00")
+    with app.app_context():
+        return (
+            BookingRequest.query.filter_by(booking_id=booking_id).one().reference_number
+        )
+
+
+def _wait_in_thread(app, url):
+    results = queue.Queue()
+
+    def wait():
+        started = time.monotonic()
+        response = app.test_client().get(url)
+        results.put((response, time.monotonic() - started))
+
+    threading.Thread(target=wait, daemon=True).start()
+    return results
+
+
+def test_wait_returns_when_the_booking_is_reviewed(make_app, book):
+    app = make_app(STATUS_POLL_TIMEOUT=5)
+    booking_id = book("10:00", "11:00")
+    with app.app_context():
+        reference = (
+            BookingRequest.query.filter_by(booking_id=booking_id).one().reference_number
+        )
+
+    results = _wait_in_thread(app, f"/api/booking-status/{reference}/wait")
+    time.sleep(0.2)
+    app.test_client().post(f"/admin/review/{booking_id}", data={"approve": "y"})
+
+    response, elapsed = results.get(timeout=5)
+    assert response.json["status"] == "approved"
+    assert elapsed < 5
+
+
+def test_wait_is_bounded_by_the_poll_timeout(make_app, book):
+    app = make_app(STATUS_POLL_TIMEOUT=0.2)
+    booking_id = book("10:00", "11:00")
+    with app.app_context():
+        reference = (
+            BookingRequest.query.filter_by(booking_id=booking_id).one().reference_number
+        )
+
+    response = app.test_client().get(f"/api/booking-status/{reference}/wait")
+    assert response.status_code == 200
+    assert response.json["status"] == "pending"
+    assert response.headers["Cache-Control"] == "no-store"
+
+
+def test_wait_answers_at_once_when_the_client_is_behind(client, reference):
+    started = time.monotonic()
+    response = client.get(f"/api/booking-status/{reference}/wait?since=approved")
+    assert response.json["status"] == "pending"
+    assert time.monotonic() - started < 1
+
+
+def test_wait_for_unknown_reference(client):
+    assert client.get("/api/booking-status/VB0000000/wait").status_code == 404
+
+
+@pytest.fixture
+def redis_url():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.TcpFakeServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    yield f"redis://{host}:{port}/0"
+    server.shutdown()
+    server.server_close()
+
+
+def _publish_from_another_process(redis_url, reference):
+    return subprocess.Popen(
+        [sys.executable, "-c", PUBLISHER, ROOT, redis_url, reference]
+    )
+
+
+def _receive(broker, reference, redis_url):
+    waiter = broker.subscribe(reference)
+    publisher = _publish_from_another_process(redis_url, reference)
+    try:
+        return waiter.get(timeout=10)
+    finally:
+        publisher.kill()
+        publisher.wait()
+        broker.unsubscribe(reference, waiter)
+
+
+def test_redis_broker_delivers_across_processes(redis_url, app):
+    broker = RedisBroker(redis_url, app.logger)
+    assert _receive(broker, "VB1234567", redis_url)["status"] == "approved"
+
+
+def test_redis_broker_reconnects_after_connection_loss(redis_url, app, caplog):
+    broker = RedisBroker(redis_url, app.logger, retry_max=0.5)
+    assert _receive(broker, "VB1234567", redis_url)["status"] == "approved"
+
+    # Drop the subscriber's connection under the listening thread
+    broker._pubsub.connection._sock.shutdown(socket.SHUT_RDWR)
+
+    assert _receive(broker, "VB7654321", redis_url)["status"] == "approved"
+    assert broker._thread.is_alive()
+    assert "Status event subscription failed" in caplog.text
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Process-local cache of the venue catalog.
+
+Venues change rarely, but forms, views and emails all need them. The cache
+loads the table once into immutable VenueRecord tuples and reloads after
+VENUE_CACHE_TTL seconds. Committing an insert, update or delete of a Venue
+through the ORM in this process invalidates it immediately.
+"""
+
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+
+from models import db, Venue
+
+VenueRecord = namedtuple(
+    "VenueRecord", "id name description capacity location amenities"
+)
+
+
+class VenueCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._venues = ()
+        self._by_id = {}
+        self.etag = None
+
+    def _load(self):
+        rows = db.session.query(
+            Venue.id,
+            Venue.name,
+            Venue.description,
+            Venue.capacity,
+            Venue.location,
+            Venue.amenities,
+        ).order_by(Venue.name)
+        venues = tuple(VenueRecord(*row) for row in rows)
+        self._venues = venues
+        self._by_id = {venue.id: venue for venue in venues}
+        # Content hash, identical across processes holding the same catalog
+        self.etag = hashlib.sha1(repr(venues).encode("utf-8")).hexdigest()
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return
+        with self._lock:
+            if (
+                self._loaded_at is None
+                or time.monotonic() - self._loaded_at >= self.ttl
+            ):
+                self._load()
+
+    def all(self):
+        """All venues, ordered by name"""
+        self._ensure_loaded()
+        return self._venues
+
+    def get(self, venue_id):
+        self._ensure_loaded()
+        return self._by_id.get(venue_id)
+
+    def version(self):
+        self._ensure_loaded()
+        return self.etag
+
+    def invalidate(self):
+        self._loaded_at = None
+
+
+def init_venue_cache(app):
+    cache = VenueCache(app.config["VENUE_CACHE_TTL"])
+    app.extensions["venue_cache"] = cache
+    return cache
+
+
+def _cache():
+    return current_app.extensions["venue_cache"]
+
+
+def get_venues():
+    return _cache().all()
+
+
+def get_venue(venue_id):
+    return _cache().get(venue_id)
+
+
+def venue_catalog_version():
+    return _cache().version()
+
+
+def invalidate_venue_cache():
+    if has_app_context() and "venue_cache" in current_app.extensions:
+        _cache().invalidate()
+
+
+@db.event.listens_for(Venue, "after_insert")
+@db.event.listens_for(Venue, "after_update")
+@db.event.listens_for(Venue, "after_delete")
+def _venue_changed(mapper, connection, target):
+    # Invalidate once the change is committed, not while it is still private
+    session = db.object_session(target)
+    if session is not None:
+        session.info["venues_changed"] = True
+
+
+@db.event.listens_for(db.orm.Session, "after_commit")
+def _session_committed(session):
+    if session.info.pop("venues_changed", False):
+        invalidate_venue_cache()